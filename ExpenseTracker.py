@@ -1,103 +1,144 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
+import atexit
+import csv
 import datetime
-import matplotlib.pyplot as plt
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import wait
+from expense_core.ledger import (
+    DEFAULT_CATEGORIES, EDITABLE_COLUMNS, create_tables, add_transaction, get_transactions_between, has_transactions,
+    get_categories, diff_transactions, apply_transaction_changes, reset_transactions, update_savings, set_savings,
+    get_savings, get_card_limits, get_card_summary, update_card_limit, add_card, remove_card,
+)
+from expense_core.db import data_version, pool_stats
+from expense_core.writer import writer_stats
+from expense_core.profiling import profiler
+from expense_core.cache import query_cache
+from expense_core.charts import pie_spec, pie_png
+from expense_core.schema import month_key, month_label
+from expense_core.search import search_transactions
+from expense_core.importer import PRESETS, import_statement
+from expense_core.exporter import FORMATS, available_formats, export_to_file
+from expense_core.pagination import PAGE_SIZES, fetch_page
+from expense_core.backup import KEEP_BACKUPS, list_backups, reset_undoable, restore_backup, take_snapshot, undo_reset
+from expense_core.archive import KEEP_MONTHS, archive_closed_months, archive_stats
+from expense_core.recurring import FREQUENCIES, add_schedule, get_schedules, materialize, remove_schedule, set_schedule_active
+from expense_core.alerts import get_alerts, get_budgets, remove_budget, set_budget, set_card_alert_ratio
+from expense_core.trends import TRENDS, WINDOWS, submit_trends
+from expense_core.rollups import totals_by_type, totals_by_category, available_months
 
 st.set_page_config(page_title="Expense Tracker", layout="wide")
-DB_FILE = "expense_data.db"
+rerun_started = time.perf_counter()
 
 # -----------------------------
 # Database Setup
 # -----------------------------
-def create_tables():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT, date TEXT, month TEXT,
-            amount REAL, category TEXT,
-            description TEXT, card TEXT
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS savings (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            amount REAL
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS card_limits (
-            card TEXT PRIMARY KEY,
-            max_limit REAL
-        )
-    ''')
-    c.execute('INSERT OR IGNORE INTO savings (id, amount) VALUES (1, 0)')
-    for card in ['RBC', 'Rogers', 'CIBC', 'CIBC Costco', 'Walmart', 'Triangle', 'Scotia']:
-        c.execute('INSERT OR IGNORE INTO card_limits (card, max_limit) VALUES (?, ?)', (card, 0))
-    conn.commit()
-    conn.close()
-
-create_tables()
-
-# -----------------------------
-# Database Functions
-# -----------------------------
-def add_transaction(trx):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO transactions (type, date, month, amount, category, description, card)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (trx["type"], trx["date"], trx["month"], trx["amount"], trx["category"], trx["description"], trx["card"]))
-    conn.commit()
-    conn.close()
-
-def get_transactions():
-    return pd.read_sql("SELECT * FROM transactions ORDER BY date DESC", sqlite3.connect(DB_FILE))
-
-def delete_transaction(trx_id):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('DELETE FROM transactions WHERE id = ?', (trx_id,))
-    conn.commit()
-    conn.close()
-
-def update_transaction(trx_id, amount, description):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('UPDATE transactions SET amount = ?, description = ? WHERE id = ?', (amount, description, trx_id))
-    conn.commit()
-    conn.close()
-
-def update_savings(amount):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('UPDATE savings SET amount = amount + ?', (amount,))
-    conn.commit()
-    conn.close()
-
-def set_savings(amount):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('UPDATE savings SET amount = ?', (amount,))
-    conn.commit()
-    conn.close()
-
-def get_savings():
-    conn = sqlite3.connect(DB_FILE)
-    return conn.execute('SELECT amount FROM savings WHERE id=1').fetchone()[0]
-
-def get_card_limits():
-    return pd.read_sql("SELECT * FROM card_limits", sqlite3.connect(DB_FILE))
-
-def update_card_limit(card, limit):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('UPDATE card_limits SET max_limit = ? WHERE card = ?', (limit, card))
-    conn.commit()
-    conn.close()
+@st.cache_resource
+def init_database():
+    # Schema setup and migrations run once per process, not on every rerun
+    create_tables()
+
+init_database()
+
+# -----------------------------
+# Lazy Exports
+# -----------------------------
+# Prepared files live in one directory per server process, removed when it
+# exits. Files a session prepared but never downloaded are removed once they
+# are older than EXPORT_TTL, since Streamlit has no session-end hook.
+EXPORT_TTL = 3600  # seconds
+
+@st.cache_resource
+def export_dir():
+    path = tempfile.mkdtemp(prefix="expense_exports_")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+def prune_exports():
+    cutoff = time.time() - EXPORT_TTL
+    for entry in os.scandir(export_dir()):
+        if entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+def discard_export(state_key):
+    prepared = st.session_state.pop(state_key, None)
+    if prepared and os.path.exists(prepared[1]):
+        os.remove(prepared[1])
+
+def export_download(key, label, file_name, fmt="csv", **filters):
+    # The export file is only built when asked for. It belongs to the format,
+    # filters and ledger version it was built from and is thrown away as soon
+    # as any of them changes, so a stale file is never served. It is also
+    # thrown away once downloaded. That way the file is read back for the
+    # download button only until it has been delivered, not on every rerun.
+    state_key = f"export_{key}"
+    signature = (fmt, tuple(sorted((name, str(value)) for name, value in filters.items())),
+                 data_version("transactions"))
+    prepared = st.session_state.get(state_key)
+    if prepared and prepared[0] != signature:
+        discard_export(state_key)
+        prepared = None
+    if st.button(f"Prepare {label}", key=f"prepare_{key}"):
+        discard_export(state_key)
+        prune_exports()
+        prepared = st.session_state[state_key] = (signature, export_to_file(fmt, directory=export_dir(), **filters))
+    if prepared and os.path.exists(prepared[1]):
+        with open(prepared[1], "rb") as f:
+            st.download_button(f"Download {label}", f, file_name, FORMATS[fmt][0], key=f"download_{key}",
+                               on_click=discard_export, args=(state_key,))
+
+# -----------------------------
+# Paginated Transaction Browser
+# -----------------------------
+def transaction_browser(key, filters):
+    # Only the visible page is read from SQLite; the cursor stack holds the
+    # (date, id) each page starts after, so Previous is a pop.
+    col1, col2 = st.columns(2)
+    page_size = col1.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    newest_first = col2.selectbox("Sort by date", ["Newest first", "Oldest first"], key=f"{key}_sort") == "Newest first"
+
+    signature = (tuple(sorted(filters.items())), page_size, newest_first)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    page, next_cursor = fetch_page(cursors[-1], page_size, newest_first, filters)
+    if page.empty:
+        st.info("No transactions match these filters.")
+        return
+    st.dataframe(page, hide_index=True)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    if col_prev.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun(scope="fragment")
+    col_page.caption(f"Page {len(cursors)}")
+    if col_next.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun(scope="fragment")
+
+# -----------------------------
+# Fragment Invalidation
+# -----------------------------
+# Every dashboard section below is a st.fragment, so interacting with a
+# widget only reruns the section it lives in. A write that changes data other
+# sections show calls invalidate(), which reruns the app once (the caches and
+# rollups keep that cheap); a change only the current section shows passes
+# scope="fragment". Fragments that do so call show_flash() first, since a
+# fragment rerun never reaches the one at the top of the script.
+def invalidate(message=None, scope="app"):
+    if message:
+        st.session_state.flash = message
+    st.rerun(scope=scope)
+
+def show_flash():
+    message = st.session_state.pop("flash", None)
+    if message:
+        st.toast(message)
+
 # -----------------------------
 # Secure Login and Session Setup
 # -----------------------------
@@ -108,16 +149,10 @@ if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "show_reminder" not in st.session_state:
     st.session_state.show_reminder = True
-    
-# Initialize default and custom categories
-default_categories = [
-    "🧒 Day Care", "🎓 Education", "🎮 Entertainment", "🍽️ Food", "🛒 Grocery",
-    "🛡️ Insurance", "📈 Investments", "🏥 Medical", "🧾 Miscellaneous",
-    "🏠 Rent", "🛍️ Shopping", "🚌 Transportation", "💡 Utilities"
-]
 
+# Initialize default and custom categories
 if "categories" not in st.session_state:
-    st.session_state.categories = default_categories.copy()
+    st.session_state.categories = DEFAULT_CATEGORIES.copy()
 
 
 if not st.session_state.logged_in:
@@ -133,457 +168,815 @@ if not st.session_state.logged_in:
                 st.error("Invalid credentials")
     st.stop()
 
-if st.session_state.show_reminder:
-    st.info(f"🔔 Reminder: Record today's expenses! ({datetime.date.today():%B %d, %Y})")
-    if st.button("Dismiss Reminder ❌"):
-        st.session_state.show_reminder = False
-        st.rerun()
+show_flash()
+
+# Recurring entries that fell due since the last visit are written once per
+# session; re-running is a no-op, so concurrent sessions are harmless.
+if "recurring_caught_up" not in st.session_state:
+    st.session_state.recurring_caught_up = materialize()
+    if st.session_state.recurring_caught_up["inserted"]:
+        st.toast(f"Recorded {st.session_state.recurring_caught_up['inserted']} recurring transactions.")
+
+@st.fragment
+@profiler.timed()
+def reminder():
+    if st.session_state.show_reminder:
+        st.info(f"🔔 Reminder: Record today's expenses! ({datetime.date.today():%B %d, %Y})")
+        if st.button("Dismiss Reminder ❌"):
+            st.session_state.show_reminder = False
+            invalidate(scope="fragment")
+
+reminder()
 
 st.title("Expense Tracker Dashboard")
 
 # -----------------------------
 # Sidebar - Add Income, Savings, Expense, Repayment
 # -----------------------------
-
-st.sidebar.header("Add Income")
-
-# Jobin
-with st.sidebar.form("jobin_form"):
-    jobin = st.number_input("Jobin Income", min_value=0.0, step=1.0, key="jobin_income_input")
-    if st.form_submit_button("Add Jobin Income"):
-        today = datetime.date.today()
+@st.fragment
+@profiler.timed()
+def income_forms():
+    st.header("Add Income")
+
+    # Jobin
+    with st.form("jobin_form"):
+        jobin = st.number_input("Jobin Income", min_value=0.0, step=1.0, key="jobin_income_input")
+        if st.form_submit_button("Add Jobin Income"):
+            today = datetime.date.today()
+            add_transaction({
+                "type": "Income",
+                "date": today,
+                "amount": jobin,
+                "category": "Income",
+                "description": "Jobin Salary",
+                "card": ""
+            })
+            invalidate(f"₹{jobin} Jobin Income added!")
+
+    # Anna
+    with st.form("anna_form"):
+        anna = st.number_input("Anna Income", min_value=0.0, step=1.0, key="anna_income_input")
+        if st.form_submit_button("Add Anna Income"):
+            today = datetime.date.today()
+            add_transaction({
+                "type": "Income",
+                "date": today,
+                "amount": anna,
+                "category": "Income",
+                "description": "Anna Salary",
+                "card": ""
+            })
+            invalidate(f"₹{anna} Anna Income added!")
+
+    # Izaak
+    with st.form("izaak_form"):
+        izaak = st.number_input("Izaak Income", min_value=0.0, step=1.0, key="izaak_income_input")
+        if st.form_submit_button("Add Izaak Income"):
+            today = datetime.date.today()
+            add_transaction({
+                "type": "Income",
+                "date": today,
+                "amount": izaak,
+                "category": "Income",
+                "description": "Izaak CCB",
+                "card": ""
+            })
+            invalidate(f"₹{izaak} Izaak Income added!")
+
+
+@st.fragment
+@profiler.timed()
+def recurring_entries():
+    show_flash()
+    st.header("Recurring Transactions")
+
+    schedules = get_schedules()
+    if schedules:
+        st.dataframe(
+            [{"name": s["name"], "amount": s["amount"], "every": s["frequency"], "next": s["next_date"],
+              "active": bool(s["active"])} for s in schedules],
+            hide_index=True,
+        )
+        names = {s["name"]: s for s in schedules}
+        chosen = st.selectbox("Schedule", ["-- Select schedule --"] + list(names), key="recurring_select")
+        col_toggle, col_remove = st.columns(2)
+        if chosen in names:
+            schedule = names[chosen]
+            if col_toggle.button("Resume" if not schedule["active"] else "Pause", key="recurring_toggle"):
+                set_schedule_active(schedule["id"], not schedule["active"])
+                invalidate(f"{chosen} {'resumed' if not schedule['active'] else 'paused'}.", scope="fragment")
+            if col_remove.button("Remove", key="recurring_remove"):
+                remove_schedule(schedule["id"])
+                invalidate(f"❌ Removed schedule: {chosen}", scope="fragment")
+
+    with st.form("recurring_form", clear_on_submit=True):
+        r_name = st.text_input("Name", placeholder="e.g. Rent")
+        r_type = st.selectbox("Type", ["Expense", "Income", "Repayment"])
+        r_amount = st.number_input("Amount", min_value=0.0, step=1.0)
+        r_category = st.selectbox("Category", ["Income", "Repayment"] + sorted(st.session_state.categories))
+        r_card = st.selectbox("Card", ["None"] + get_card_limits()["card"].tolist())
+        r_frequency = st.selectbox("Repeats", FREQUENCIES, index=FREQUENCIES.index("monthly"))
+        r_start = st.date_input("First occurrence", datetime.date.today())
+        if st.form_submit_button("Add Schedule") and r_name.strip():
+            try:
+                schedule_id = add_schedule(r_name.strip(), r_type, r_amount, r_category, r_name.strip(),
+                                           r_card if r_card != "None" else "", r_frequency, r_start)
+            except Exception as exc:
+                st.error(f"Could not add schedule: {exc}")
+            else:
+                # Backfill a schedule that starts in the past right away
+                result = materialize(schedule_ids=[schedule_id])
+                invalidate(f"✅ Schedule '{r_name.strip()}' added, {result['inserted']} occurrences recorded.")
+
+    if st.button("Catch Up Now", key="recurring_catch_up"):
+        result = materialize()
+        invalidate(f"Recorded {result['inserted']} recurring transactions "
+                   f"({result['duplicates']} already recorded).")
+
+
+@st.fragment
+@profiler.timed()
+def savings_entry():
+    st.header("Savings")
+
+    add_save = st.number_input("Add to Savings", min_value=0.0, step=1.0)
+    if st.button("Add Savings"):
+        update_savings(add_save)
+        invalidate("Savings updated.")
+
+    set_save = st.number_input("Set Total Savings", min_value=0.0, step=1.0)
+    if st.button("Set Savings"):
+        set_savings(set_save)
+        invalidate("Savings manually set.")
+
+
+@st.fragment
+@profiler.timed()
+def expense_entry():
+    show_flash()
+    st.header("Add Expense")
+    e_amt = st.number_input("Expense Amount", min_value=0.0, step=1.0)
+
+    # -----------------------------
+    # Category Management (sorted + safe)
+    # -----------------------------
+    # Ensure categories are sorted
+    st.session_state.categories = sorted(st.session_state.categories)
+
+    # Select category with no default selected
+    category_options = ["-- Select Category --"] + st.session_state.categories
+    e_cat = st.selectbox("Category", category_options, index=0, key="category_select")
+
+    e_desc = st.text_area("Notes / Tags (optional)")
+    e_card = st.selectbox("Paid using Card?", ["None"] + get_card_limits()["card"].tolist())
+    e_date = st.date_input("Expense Date", datetime.date.today())
+
+    if st.button("Add Expense"):
         add_transaction({
-            "type": "Income",
-            "date": today,
-            "month": today.strftime("%B %Y"),
-            "amount": jobin,
-            "category": "Income",
-            "description": "Jobin Salary",
-            "card": ""
+            "type": "Expense",
+            "date": e_date,
+            "amount": e_amt,
+            "category": e_cat,
+            "description": e_desc,
+            "card": e_card if e_card != "None" else ""
         })
-        st.sidebar.success(f"₹{jobin} Jobin Income added!")
+        invalidate("Expense added.")
+
+    # Add Custom Category
+    st.markdown("### ➕ Add Custom Category")
+    new_cat = st.text_input("Add Category", key="new_category_input")
+    if st.button("Add Category", key="add_category_btn") and new_cat.strip():
+        cat_to_add = new_cat.strip()
+        if cat_to_add not in st.session_state.categories:
+            st.session_state.categories.append(cat_to_add)
+            invalidate(f"✅ Added: {cat_to_add}")
+        else:
+            st.warning("Category already exists.")
+
+    # Remove Category
+    st.markdown("### ➖ Remove Category")
+    remove_cat = st.selectbox(
+        "Select category to remove",
+        ["-- Select Category --"] + st.session_state.categories,
+        index=0,
+        key="remove_category"
+    )
+    if st.button("Remove Selected Category", key="remove_category_btn"):
+        if remove_cat != "-- Select Category --":
+            st.session_state.categories.remove(remove_cat)
+            invalidate(f"❌ Removed: {remove_cat}")
+        else:
+            st.warning("Please select a valid category.")
 
-# Anna
-with st.sidebar.form("anna_form"):
-    anna = st.number_input("Anna Income", min_value=0.0, step=1.0, key="anna_income_input")
-    if st.form_submit_button("Add Anna Income"):
-        today = datetime.date.today()
-        add_transaction({
-            "type": "Income",
-            "date": today,
-            "month": today.strftime("%B %Y"),
-            "amount": anna,
-            "category": "Income",
-            "description": "Anna Salary",
-            "card": ""
-        })
-        st.sidebar.success(f"₹{anna} Anna Income added!")
 
-# Izaak
-with st.sidebar.form("izaak_form"):
-    izaak = st.number_input("Izaak Income", min_value=0.0, step=1.0, key="izaak_income_input")
-    if st.form_submit_button("Add Izaak Income"):
+@st.fragment
+@profiler.timed()
+def repayment_entry():
+    st.header("Credit Card Repayment")
+    rep_card = st.selectbox("Repayment Card", get_card_limits()["card"].tolist())
+    rep_amt = st.number_input("Repayment Amount", min_value=0.0, step=1.0)
+    if st.button("Add Repayment"):
         today = datetime.date.today()
         add_transaction({
-            "type": "Income",
+            "type": "Repayment",
             "date": today,
-            "month": today.strftime("%B %Y"),
-            "amount": izaak,
-            "category": "Income",
-            "description": "Izaak CCB",
-            "card": ""
+            "amount": rep_amt,
+            "category": "Repayment",
+            "description": f"Repayment to {rep_card}",
+            "card": rep_card
         })
-        st.sidebar.success(f"₹{izaak} Izaak Income added!")
-
-
-
-st.sidebar.header("Savings")
-
-add_save = st.sidebar.number_input("Add to Savings", min_value=0.0, step=1.0)
-if st.sidebar.button("Add Savings"):
-     update_savings(add_save)
-     st.sidebar.success("Savings updated.")
- 
-set_save = st.sidebar.number_input("Set Total Savings", min_value=0.0, step=1.0)
-if st.sidebar.button("Set Savings"):
-     set_savings(set_save)
-     st.sidebar.success("Savings manually set.")
-
-st.sidebar.header("Add Expense")
-e_amt = st.sidebar.number_input("Expense Amount", min_value=0.0, step=1.0)
-
-# -----------------------------
-# Category Management (sorted + safe)
-# -----------------------------
-# Ensure categories are sorted
-st.session_state.categories = sorted(st.session_state.categories)
-
-# Select category with no default selected
-category_options = ["-- Select Category --"] + st.session_state.categories
-e_cat = st.sidebar.selectbox("Category", category_options, index=0, key="category_select")
+        invalidate("Repayment added.")
+
+
+@st.fragment
+@profiler.timed()
+def statement_import():
+    st.header("Import Statement")
+    with st.form("import_form", clear_on_submit=True):
+        stmt_file = st.file_uploader("Statement file (CSV, OFX, QFX)", type=["csv", "ofx", "qfx"])
+        stmt_preset = st.selectbox("CSV layout", sorted(PRESETS))
+        stmt_card = st.selectbox("Statement card", ["None"] + get_card_limits()["card"].tolist())
+        if st.form_submit_button("Import") and stmt_file is not None:
+            try:
+                result = import_statement(stmt_file, preset=stmt_preset, card=stmt_card if stmt_card != "None" else "")
+            except (ValueError, KeyError, csv.Error) as exc:
+                # Wrong layout (missing column), an unreadable row or a malformed
+                # CSV such as an oversized field; nothing was written
+                st.error(f"Could not import {stmt_file.name}: {exc}")
+            else:
+                invalidate(
+                    f"Imported {result['inserted']} of {result['read']} rows "
+                    f"({result['duplicates']} duplicates) at {result['rows_per_second']:,.0f} rows/s."
+                )
 
-e_desc = st.sidebar.text_area("Notes / Tags (optional)")
-e_card = st.sidebar.selectbox("Paid using Card?", ["None"] + get_card_limits()["card"].tolist())
-e_date = st.sidebar.date_input("Expense Date", datetime.date.today())
 
-if st.sidebar.button("Add Expense"):
-    add_transaction({
-        "type": "Expense",
-        "date": e_date,
-        "month": e_date.strftime("%B %Y"),
-        "amount": e_amt,
-        "category": e_cat,
-        "description": e_desc,
-        "card": e_card if e_card != "None" else ""
-    })
-    st.sidebar.success("Expense added.")
 
+@st.fragment
+@profiler.timed()
+def card_management():
+    st.header("Manage Credit Cards")
 
+    new_card = st.text_input("Add New Credit Card")
+    if st.button("Add Credit Card") and new_card.strip():
+        card_name = new_card.strip()
+        existing_cards = [c.strip().lower() for c in get_card_limits()["card"].tolist()]
+        if card_name.lower() in existing_cards:
+            st.warning("Card already exists.")
+        else:
+            add_card(card_name)
+            invalidate(f"✅ Card '{card_name}' added!")
+
+    # -----------------------------
+    # Remove Credit Card (any card)
+    # -----------------------------
+    st.markdown("### ➖ Remove Credit Card")
+
+    all_cards = get_card_limits()["card"].tolist()
+
+    if all_cards:
+        card_to_remove = st.selectbox(
+            "Select a card to remove",
+            ["-- Select card --"] + all_cards,
+            index=0,
+            key="remove_credit_card"
+        )
 
-# Add Custom Category
-st.sidebar.markdown("### ➕ Add Custom Category")
-new_cat = st.sidebar.text_input("Add Category", key="new_category_input")
-if st.sidebar.button("Add Category", key="add_category_btn") and new_cat.strip():
-    cat_to_add = new_cat.strip()
-    if cat_to_add not in st.session_state.categories:
-        st.session_state.categories.append(cat_to_add)
-        st.sidebar.success(f"✅ Added: {cat_to_add}")
-    else:
-        st.sidebar.warning("Category already exists.")
-
-# Remove Category
-st.sidebar.markdown("### ➖ Remove Category")
-remove_cat = st.sidebar.selectbox(
-    "Select category to remove",
-    ["-- Select Category --"] + st.session_state.categories,
-    index=0,
-    key="remove_category"
-)
-if st.sidebar.button("Remove Selected Category", key="remove_category_btn"):
-    if remove_cat != "-- Select Category --":
-        st.session_state.categories.remove(remove_cat)
-        st.sidebar.success(f"❌ Removed: {remove_cat}")
-        st.rerun()
+        if st.button("Remove Selected Card"):
+            if card_to_remove != "-- Select card --":
+                remove_card(card_to_remove)
+                invalidate(f"❌ Removed card: {card_to_remove}")
+            else:
+                st.warning("Please select a card to remove.")
     else:
-        st.sidebar.warning("Please select a valid category.")
-
+        st.info("No cards available to remove.")
 
 
+with st.sidebar:
+    income_forms()
+    recurring_entries()
+    savings_entry()
+    expense_entry()
+    repayment_entry()
+    statement_import()
+    card_management()
 
-st.sidebar.header("Credit Card Repayment")
-rep_card = st.sidebar.selectbox("Repayment Card", get_card_limits()["card"].tolist())
-rep_amt = st.sidebar.number_input("Repayment Amount", min_value=0.0, step=1.0)
-if st.sidebar.button("Add Repayment"):
-    today = datetime.date.today()
-    add_transaction({
-        "type": "Repayment",
-        "date": today,
-        "month": today.strftime("%B %Y"),
-        "amount": rep_amt,
-        "category": "Repayment",
-        "description": f"Repayment to {rep_card}",
-        "card": rep_card
-    })
-    st.sidebar.success("Repayment added.")
-
-
-st.sidebar.header("Manage Credit Cards")
 
-new_card = st.sidebar.text_input("Add New Credit Card")
-if st.sidebar.button("Add Credit Card") and new_card.strip():
-    card_name = new_card.strip()
-    existing_cards = [c.strip().lower() for c in get_card_limits()["card"].tolist()]
-    if card_name.lower() in existing_cards:
-        st.sidebar.warning("Card already exists.")
-    else:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("INSERT OR IGNORE INTO card_limits (card, max_limit) VALUES (?, ?)", (card_name, 0))
-        conn.commit()
-        conn.close()
-        st.sidebar.success(f"✅ Card '{card_name}' added!")
-        st.rerun()
-
-DEFAULT_CARDS = ["RBC", "Rogers", "CIBC", "CIBC Costco", "Walmart", "Triangle", "Scotia"]
 # -----------------------------
-# Remove Credit Card (any card)
+# Dashboard Summary (Always Show)
 # -----------------------------
-st.sidebar.markdown("### ➖ Remove Credit Card")
-
-all_cards = get_card_limits()["card"].tolist()
-
-if all_cards:
-    card_to_remove = st.sidebar.selectbox(
-        "Select a card to remove",
-        ["-- Select card --"] + all_cards,
-        index=0,
-        key="remove_credit_card"
-    )
+@st.fragment
+@profiler.timed()
+def dashboard_summary():
+    st.subheader("Dashboard Summary")
+    savings_total = get_savings()
+
+    # Totals come from the rollup table instead of scanning the ledger
+    type_totals = totals_by_type()
+    income_total = type_totals.get("Income", 0)
+    expense_total = type_totals.get("Expense", 0)
+    balance = income_total - expense_total
 
-    if st.sidebar.button("Remove Selected Card"):
-        if card_to_remove != "-- Select card --":
-            conn = sqlite3.connect(DB_FILE)
-            c = conn.cursor()
-            c.execute("DELETE FROM card_limits WHERE card = ?", (card_to_remove,))
-            conn.commit()
-            conn.close()
-            st.sidebar.success(f"❌ Removed card: {card_to_remove}")
-            st.rerun()
+    # Show summary metrics
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Income", f"₹{income_total:,.2f}")
+    col2.metric("Total Expenses", f"₹{expense_total:,.2f}")
+    col3.metric("Total Savings", f"₹{savings_total:,.2f}")
+    col4.metric("Remaining Balance", f"₹{balance:,.2f}")
+
+    # Pie Chart of Expenses
+    st.subheader("Expenses by Category (Pie Chart)")
+    if has_transactions():
+        chart = totals_by_category("Expense")
+        if chart:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                renderer = st.radio("Chart style", ["Interactive", "Image"], horizontal=True, key="pie_renderer")
+                if renderer == "Interactive":
+                    st.vega_lite_chart(pie_spec(chart), use_container_width=True)
+                else:
+                    # Rendered with matplotlib once per change of the category totals
+                    st.image(pie_png(chart))
         else:
-            st.sidebar.warning("Please select a card to remove.")
-else:
-    st.sidebar.info("No cards available to remove.")
+            st.info("No expenses yet to plot.")
+    else:
+        st.info("No transactions to display.")
 
+dashboard_summary()
 
 
 # -----------------------------
-# Dashboard Summary (Always Show)
+# Budget & Card Alerts
 # -----------------------------
-st.subheader("Dashboard Summary")
-# Get data BEFORE using df
-df = get_transactions()
-savings_total = get_savings()
-
-# Safely calculate totals
-income_total = df[df["type"] == "Income"]["amount"].sum() if not df.empty else 0
-expense_total = df[df["type"] == "Expense"]["amount"].sum() if not df.empty else 0
-balance = income_total - expense_total
-
-# Show summary metrics
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("Total Income", f"₹{income_total:,.2f}")
-col2.metric("Total Expenses", f"₹{expense_total:,.2f}")
-col3.metric("Total Savings", f"₹{savings_total:,.2f}")
-col4.metric("Remaining Balance", f"₹{balance:,.2f}")
-
-# Pie Chart of Expenses
-st.subheader("Expenses by Category (Pie Chart)")
-if not df.empty:
-    chart = df[df["type"] == "Expense"].groupby("category")["amount"].sum()
-    if not chart.empty:
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            fig, ax = plt.subplots(figsize=(4, 4))
-            chart.plot.pie(autopct='%1.1f%%', ax=ax)
-            plt.ylabel("")
-            plt.tight_layout()
-            st.pyplot(fig, bbox_inches='tight')
+# Alerts are kept current by triggers on every write, so this only reads the
+# rows that are at or over their threshold.
+@st.fragment
+@profiler.timed()
+def budget_alerts():
+    show_flash()
+    st.subheader("Alerts")
+    alerts = get_alerts(month_key(datetime.date.today()))
+    if alerts:
+        for alert in alerts:
+            what = "budget" if alert["kind"] == "budget" else "card limit"
+            text = (f"{alert['subject']} {what}: ₹{alert['used']:,.2f} of ₹{alert['limit']:,.2f} "
+                    f"({alert['ratio']:.0%})")
+            if alert["level"] == "exceeded":
+                st.error(f"🚨 {text}")
+            else:
+                st.warning(f"⚠️ {text}")
     else:
-        st.info("No expenses yet to plot.")
-else:
-    st.info("No transactions to display.")
+        st.success("All budgets and cards are within their thresholds this month.")
 
-        
-# -----------------------------
-# Monthly Report Section
-# -----------------------------
-st.subheader("Monthly Report")
+    with st.expander("Monthly Budgets"):
+        budgets = get_budgets()
+        for name, amount, warn_ratio in budgets:
+            st.write(f"**{name}:** ₹{amount:,.2f} per month, warn at {warn_ratio:.0%}")
 
-# Step 1: Get available months
-available_months = df['month'].unique().tolist()
+        col1, col2, col3 = st.columns(3)
+        b_category = col1.selectbox("Category", st.session_state.categories, key="budget_category")
+        b_amount = col2.number_input("Monthly Budget", min_value=0.0, format="%.2f", key="budget_amount")
+        b_warn = col3.slider("Warn at % of budget", 50, 100, 80, key="budget_warn")
+        col1, col2 = st.columns(2)
+        if col1.button("Save Budget") and b_amount > 0:
+            set_budget(b_category, b_amount, b_warn / 100)
+            invalidate(f"Budget for {b_category} saved.", scope="fragment")
+        if col2.button("Remove Budget") and b_category in [b[0] for b in budgets]:
+            remove_budget(b_category)
+            invalidate(f"Budget for {b_category} removed.", scope="fragment")
 
-if available_months:
-    selected_month = st.selectbox("Select Month for Report", sorted(available_months))
+budget_alerts()
 
-    # Step 2: Filter by selected month
-    df_month = df[df['month'] == selected_month]
 
-    # Step 3: Monthly Summary
-    income_total = df_month[df_month["type"] == "Income"]["amount"].sum()
-    expense_total = df_month[df_month["type"] == "Expense"]["amount"].sum()
-    balance = income_total - expense_total
+# -----------------------------
+# Monthly Report Section
+# -----------------------------
+@st.fragment
+@profiler.timed()
+def monthly_report():
+    st.subheader("Monthly Report")
+
+    # Step 1: Get available months
+    report_months = available_months()
+
+    if report_months:
+        selected_month = st.selectbox("Select Month for Report", report_months, format_func=month_label)
+
+        # Step 2: Monthly Summary
+        month_totals = totals_by_type(selected_month)
+        income_total = month_totals.get("Income", 0)
+        expense_total = month_totals.get("Expense", 0)
+        balance = income_total - expense_total
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Monthly Income", f"₹{income_total:,.2f}")
+        col2.metric("Monthly Expenses", f"₹{expense_total:,.2f}")
+        col3.metric("Monthly Balance", f"₹{balance:,.2f}")
+
+        # Step 3: Download Monthly CSV (built only on request)
+        export_download(
+            "month",
+            f"{month_label(selected_month)} Report (CSV)",
+            f"{month_label(selected_month).replace(' ', '_')}_report.csv",
+            month=selected_month
+        )
+    else:
+        st.info("No transactions available yet for Monthly Report.")
 
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Monthly Income", f"₹{income_total:,.2f}")
-    col2.metric("Monthly Expenses", f"₹{expense_total:,.2f}")
-    col3.metric("Monthly Balance", f"₹{balance:,.2f}")
-
-    # Step 4: Download Monthly CSV
-    csv_month = df_month.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label=f"Download {selected_month} Report (CSV)",
-        data=csv_month,
-        file_name=f"{selected_month.replace(' ', '_')}_report.csv",
-        mime="text/csv"
-    )
-else:
-    st.info("No transactions available yet for Monthly Report.")
+monthly_report()
 
 # -----------------------------
 # Edit/Delete by Date Section
 # -----------------------------
-st.subheader("Edit or Delete Transactions by Date")
+# One editable grid for the selected day or range. Nothing is written until
+# Save, which commits every edit, added row and deleted row as one batch.
+TRANSACTION_TYPES = ["Expense", "Income", "Repayment"]
 
-if not df.empty:
-    selected_date = st.date_input("Select a date to view/edit transactions", datetime.date.today())
-    df_selected = df[df['date'] == str(selected_date)]
+@st.fragment
+@profiler.timed()
+def edit_by_date():
+    st.subheader("Edit or Delete Transactions by Date")
 
-    if not df_selected.empty:
-        st.success(f"{len(df_selected)} transactions found for {selected_date}")
-        
-        for i, row in df_selected.iterrows():
-            col1, col2, col3, col4 = st.columns([4, 4, 1, 1])
-            with col1:
-                st.write(f"₹{row['amount']} | {row['category']} | {row['description']}")
-            with col2:
-                st.write(f"Card: {row['card']}")
-            with col3:
-                if st.button("✏️ Edit", key=f"edit_button_{row['id']}"):
-                    st.session_state[f"edit_mode_{row['id']}_edit"] = True
-            with col4:
-                if st.button("🗑️ Delete", key=f"delete_button_{row['id']}"):
-                    delete_transaction(row['id'])
-                    st.success("Transaction Deleted!")
-                    st.rerun()
-
-            if st.session_state.get(f"edit_mode_{row['id']}_edit", False):
-                with st.form(f"edit_form_{row['id']}_edit"):
-                    new_amt = st.number_input("New Amount", value=row['amount'], key=f"amt_{row['id']}_edit")
-                    new_desc = st.text_input("New Description", value=row['description'], key=f"desc_{row['id']}_edit")
-                    col_save, col_cancel = st.columns(2)
-                    with col_save:
-                        if st.form_submit_button("Update"):
-                            update_transaction(row['id'], new_amt, new_desc)
-                            st.success("Transaction Updated!")
-                            st.session_state[f"edit_mode_{row['id']}_edit"] = False
-                            st.rerun()
-                    with col_cancel:
-                        if st.form_submit_button("Cancel"):
-                            st.session_state[f"edit_mode_{row['id']}_edit"] = False
-                            st.rerun()
+    if has_transactions():
+        today = datetime.date.today()
+        selected = st.date_input("Select a date or range to view/edit transactions", (today, today))
+        if not selected:
+            return
+        start, end = selected[0], selected[-1]
+        df_selected = get_transactions_between(start, end, columns=["id"] + EDITABLE_COLUMNS)
+        label = f"{start}" if start == end else f"{start} to {end}"
+        if df_selected.empty:
+            st.warning("No transactions found for selected date.")
+        else:
+            st.success(f"{len(df_selected)} transactions found for {label}")
+
+        # The grid edits plain values; the cached frame is categorical/datetime64.
+        # Missing values become "" (astype(str) would save them as "nan").
+        text_columns = ["type", "category", "card"]
+        grid = df_selected.astype({column: object for column in text_columns})
+        grid[text_columns] = grid[text_columns].fillna("")
+        grid["date"] = grid["date"].dt.date
+        # Stored types outside the usual three stay selectable, so they are shown as they are
+        types = TRANSACTION_TYPES + sorted(set(grid["type"]) - set(TRANSACTION_TYPES) - {""})
+        cards = [""] + get_card_limits()["card"].tolist()
+        categories = sorted(set(st.session_state.categories) | set(grid["category"]) | {"Income", "Repayment"})
+
+        # A new key after every save or discard drops the pending edits
+        nonce = st.session_state.setdefault("edit_grid_nonce", 0)
+        edited = st.data_editor(
+            grid,
+            key=f"edit_grid_{start}_{end}_{nonce}",
+            num_rows="dynamic",
+            hide_index=True,
+            column_config={
+                "id": None,
+                "type": st.column_config.SelectboxColumn("Type", options=types, required=True, default="Expense"),
+                "date": st.column_config.DateColumn("Date", required=True, default=start),
+                "amount": st.column_config.NumberColumn("Amount", min_value=0.0, format="₹%.2f", required=True),
+                "category": st.column_config.SelectboxColumn("Category", options=categories),
+                "description": st.column_config.TextColumn("Description"),
+                "card": st.column_config.SelectboxColumn("Card", options=cards),
+            },
+        )
+
+        try:
+            inserts, updates, deletes = diff_transactions(df_selected, edited)
+        except ValueError as exc:
+            st.warning(str(exc))
+            return
+        pending = len(inserts) + len(updates) + len(deletes)
+        st.caption(f"{len(updates)} edited, {len(inserts)} added, {len(deletes)} deleted")
+
+        col_save, col_discard = st.columns(2)
+        if col_save.button("💾 Save Changes", disabled=not pending, type="primary"):
+            result = apply_transaction_changes(inserts, updates, deletes)
+            st.session_state.edit_grid_nonce += 1
+            invalidate(f"Saved: {result['updated']} updated, {result['inserted']} added, {result['deleted']} deleted.")
+        if col_discard.button("↩️ Discard Changes", disabled=not pending):
+            st.session_state.edit_grid_nonce += 1
+            invalidate(scope="fragment")
     else:
-        st.warning("No transactions found for selected date.")
-else:
-    st.info("No transactions to edit yet.")
+        st.info("No transactions to edit yet.")
 
+edit_by_date()
 
 
 # -----------------------------
 # Credit Card Dashboard
 # -----------------------------
-st.subheader("Credit Card Summary")
-card_limits = get_card_limits()
-
-for _, row in card_limits.iterrows():
-    card = row["card"]
-    limit = row["max_limit"]
-    spent = df[(df["card"] == card) & (df["type"] == "Expense")]["amount"].sum()
-    paid = df[(df["card"] == card) & (df["type"] == "Repayment")]["amount"].sum()
-    balance = spent - paid
-    available = limit - balance
-
-    with st.expander(f"💳 {card}"):
-        new_limit = st.number_input(f"{card} Max Limit", value=limit, key=f"limit_{card}")
-        if st.button(f"Update {card} Limit", key=f"btn_{card}"):
-            update_card_limit(card, new_limit)
-            st.success(f"{card} limit updated.")
-            st.rerun()
-        st.write(f"**Spent:** ₹{spent:.2f}")
-        st.write(f"**Repaid:** ₹{paid:.2f}")
-        st.write(f"**Outstanding Balance:** ₹{balance:.2f}")
-        st.write(f"**Available Credit:** ₹{available:.2f}")
-        if limit > 0:
-            st.progress(min(spent/limit, 1.0))
-            
-
-
-
-st.subheader("Search Transactions")
-search_term = st.text_input("Search description, category, or card")
-
-if search_term:
-    df_search = df[df.apply(lambda row: search_term.lower() in str(row).lower(), axis=1)]
-    if not df_search.empty:
-        st.dataframe(df_search)
-    else:
-        st.warning("No matching transactions found.")
+@st.fragment
+@profiler.timed()
+def credit_card_summary():
+    st.subheader("Credit Card Summary")
+    card_summary = get_card_summary()
+    alert_ratios = get_card_limits().set_index("card")["alert_ratio"]
+
+    for row in card_summary.itertuples(index=False):
+        card = row.card
+        limit = row.max_limit
+        spent = row.spent
+        paid = row.repaid
+        balance = row.outstanding
+        available = row.available
+
+        with st.expander(f"💳 {card}"):
+            new_limit = st.number_input(f"{card} Max Limit", value=limit, key=f"limit_{card}")
+            if st.button(f"Update {card} Limit", key=f"btn_{card}"):
+                update_card_limit(card, new_limit)
+                # The limit feeds the card alerts shown in the Alerts section
+                invalidate(f"{card} limit updated.")
+            st.write(f"**Spent:** ₹{spent:.2f}")
+            st.write(f"**Repaid:** ₹{paid:.2f}")
+            st.write(f"**Outstanding Balance:** ₹{balance:.2f}")
+            st.write(f"**Available Credit:** ₹{available:.2f}")
+            if limit > 0:
+                st.progress(float(row.utilization), text=f"{row.utilization:.0%} of limit used")
+            alert_at = st.slider(f"{card} alert at % of limit", 50, 100, int(round(alert_ratios.get(card, 0.8) * 100)),
+                                 key=f"alert_{card}")
+            if st.button(f"Update {card} Alert", key=f"alert_btn_{card}"):
+                set_card_alert_ratio(card, alert_at / 100)
+                invalidate(f"{card} alert threshold updated.")
+
+credit_card_summary()
+
+
+@st.fragment
+@profiler.timed()
+def search_section():
+    st.subheader("Search Transactions")
+    search_term = st.text_input("Search description, category, or card")
+
+    if search_term:
+        df_search = search_transactions(search_term)
+        if not df_search.empty:
+            st.dataframe(df_search)
+        else:
+            st.warning("No matching transactions found.")
 
-st.subheader("Filter by Category")
-selected_cat = st.selectbox("Choose Category", sorted(set(df["category"])))
+search_section()
 
-df_filtered = df[df["category"] == selected_cat]
-if not df_filtered.empty:
-    st.dataframe(df_filtered)
-else:
-    st.info("No transactions in this category.")
 
+@st.fragment
+@profiler.timed()
+def category_filter():
+    st.subheader("Filter by Category")
+    # As in Browse, closed months are only read when asked for, and only the
+    # categories the chosen partitions hold are offered
+    category_archived = st.checkbox("Include archived months", key="category_archived")
+    selected_cat = st.selectbox("Choose Category", get_categories(include_archive=category_archived))
 
+    if selected_cat is not None:
+        transaction_browser("category_browser", {"category": selected_cat, "archived": category_archived})
+    else:
+        st.info("No transactions in this category.")
+
+category_filter()
+
+
+@st.fragment
+@profiler.timed()
+def browse_transactions():
+    st.subheader("Browse Transactions")
+    col1, col2 = st.columns(2)
+    browse_type = col1.selectbox("Type", ["All", "Income", "Expense", "Repayment"], key="browse_type")
+    browse_card = col2.selectbox("Card", ["All"] + get_card_limits()["card"].tolist(), key="browse_card")
+    # Closed months live in the archive and are only read when asked for
+    browse_archived = st.checkbox("Include archived months", key="browse_archived")
+    transaction_browser("all_browser", {
+        "type": browse_type if browse_type != "All" else None,
+        "card": browse_card if browse_card != "All" else None,
+        "archived": browse_archived,
+    })
 
-st.subheader("Income vs Expense Ratio")
-income_total = df[df["type"] == "Income"]["amount"].sum()
-expense_total = df[df["type"] == "Expense"]["amount"].sum()
+browse_transactions()
 
-if income_total > 0:
-    ratio = (income_total - expense_total) / income_total
-    st.write(f"🧮 You're saving {ratio*100:.2f}% of your income.")
-else:
-    st.warning("No income recorded yet.")
 
+with profiler.section("income_expense_ratio"):
+    st.subheader("Income vs Expense Ratio")
+    type_totals = totals_by_type()
+    income_total = type_totals.get("Income", 0)
+    expense_total = type_totals.get("Expense", 0)
 
+    if income_total > 0:
+        ratio = (income_total - expense_total) / income_total
+        st.write(f"🧮 You're saving {ratio*100:.2f}% of your income.")
+    else:
+        st.warning("No income recorded yet.")
 
 
-st.subheader("Gold Tracker Amount")
+@st.fragment
+@profiler.timed()
+def goal_tracker(title, goal_name, goal_target, slug, input_label):
+    show_flash()
+    st.subheader(title)
+    key = f"goal_progress_{slug}"
 
-goal_name = "Gold Loan"
-goal_target = 18500
+    if key not in st.session_state:
+        st.session_state[key] = 0.0
 
-if "goal_progress_gold" not in st.session_state:
-    st.session_state.goal_progress_gold = 0.0
+    st.write(f"🎯 Goal: {goal_name}")
+    st.write(f"💰 Target: ₹{goal_target:,}")
+    st.write(f"✅ Collected: ₹{st.session_state[key]:,}")
+    st.progress(min(st.session_state[key] / goal_target, 1.0))
 
-st.write(f"🎯 Goal: {goal_name}")
-st.write(f"💰 Target: ₹{goal_target:,}")
-st.write(f"✅ Collected: ₹{st.session_state.goal_progress_gold:,}")
-st.progress(min(st.session_state.goal_progress_gold / goal_target, 1.0))
+    with st.form(f"add_to_goal_form_{slug}"):
+        add_goal_amt = st.number_input(input_label, min_value=0.0, step=100.0)
+        if st.form_submit_button("Add"):
+            st.session_state[key] += add_goal_amt
+            invalidate(f"Added ₹{add_goal_amt:.2f} to {goal_name}", scope="fragment")
 
-with st.form("add_to_goal_form_gold"):
-    add_goal_amt = st.number_input("Add to Gold Loan Goal", min_value=0.0, step=100.0)
-    if st.form_submit_button("Add"):
-        st.session_state.goal_progress_gold += add_goal_amt
-        st.success(f"Added ₹{add_goal_amt:.2f} to {goal_name}")
-        st.rerun()
+goal_tracker("Gold Tracker Amount", "Gold Loan", 18500, "gold", "Add to Gold Loan Goal")
+goal_tracker("Vacation to Kerala", "Naattil Pokan Paisa", 10000, "kerala", "Add to Kerala Goal")
 
 
-st.subheader("Vacation to Kerala")
+# -----------------------------
+# Archive Closed Months
+# -----------------------------
+@st.fragment
+@profiler.timed()
+def archive_section():
+    st.subheader("Archive Closed Months")
+    stats = archive_stats()
+    col1, col2 = st.columns(2)
+    col1.metric("Hot transactions", f"{stats['hot_rows']:,}")
+    col2.metric("Archived transactions", f"{stats['archived_rows']:,}")
+    if stats["archived_through"]:
+        st.caption(f"Archive holds {stats['archived_from']} to {stats['archived_through']}. "
+                   "Totals, search and exports still cover it.")
+    keep_months = st.number_input("Months to keep hot (including this one)", min_value=1, value=KEEP_MONTHS, step=1)
+    if st.button("Archive Closed Months"):
+        moved = archive_closed_months(int(keep_months))
+        invalidate(f"Archived {moved} transactions.")
+
+archive_section()
+
+
+# -----------------------------
+# Backups & Soft Reset
+# -----------------------------
+# Snapshots are copied online in small steps, so saving keeps working while
+# one is taken. A reset snapshots first; this session can undo it until
+# anything else is written.
+@st.fragment
+@profiler.timed()
+def backup_section():
+    show_flash()
+    st.subheader("Backups & Reset")
+    col1, col2, col3 = st.columns(3)
+    if col1.button("Back Up Now"):
+        progress = st.progress(0.0, text="Copying database pages...")
+        take_snapshot(progress=lambda status, remaining, total: progress.progress(1 - remaining / max(total, 1)))
+        invalidate("Snapshot saved.", scope="fragment")
+    if col2.button("Reset All Transactions"):
+        st.session_state.undo_reset = reset_transactions()
+        invalidate("All transactions and savings reset! Use Undo Reset to bring them back.")
+    undo = st.session_state.get("undo_reset")
+    if undo and not reset_undoable(**undo):
+        # Something was written since, which the undo would throw away
+        del st.session_state.undo_reset
+        undo = None
+    if undo and col3.button("Undo Reset"):
+        del st.session_state.undo_reset
+        if undo_reset(**undo):
+            invalidate("Reset undone.")
+        st.warning("Something was written after the reset, so it can no longer be undone.")
+
+    backups = list_backups()
+    if backups:
+        options = {f"{b['taken_at']:%Y-%m-%d %H:%M:%S} ({b['label']}, {b['bytes'] / 1e6:.1f} MB)": b["path"]
+                   for b in backups}
+        col1, col2 = st.columns([3, 1])
+        chosen = col1.selectbox("Snapshots", list(options), key="backup_choice")
+        if col2.button("Restore Snapshot"):
+            restore_backup(options[chosen])
+            invalidate(f"Restored the snapshot from {chosen}.")
+        st.caption(f"The newest {KEEP_BACKUPS} snapshots of each kind are kept. Restoring replaces everything "
+                   f"written since the snapshot.")
+
+backup_section()
+
 
-goal_name = "Naattil Pokan Paisa"
-goal_target = 10000
+# -----------------------------
+# Download CSV
+# -----------------------------
+@st.fragment
+@profiler.timed()
+def download_transactions():
+    st.subheader("Download Transactions")
+    if has_transactions():
+        col1, col2, col3, col4 = st.columns(4)
+        export_fmt = col1.selectbox("Format", available_formats(), key="export_format")
+        export_card = col2.selectbox("Card", ["All"] + get_card_limits()["card"].tolist(), key="export_card")
+        export_start = col3.date_input("From", None, key="export_start")
+        export_end = col4.date_input("To", None, key="export_end")
+        export_download(
+            "all",
+            f"{export_fmt.upper()} File",
+            f"transactions{FORMATS[export_fmt][1]}",
+            export_fmt,
+            start_date=export_start,
+            end_date=export_end,
+            card=export_card if export_card != "All" else None
+        )
 
-if "goal_progress_kerala" not in st.session_state:
-    st.session_state.goal_progress_kerala = 0.0
+download_transactions()
 
-st.write(f"🎯 Goal: {goal_name}")
-st.write(f"💰 Target: ₹{goal_target:,}")
-st.write(f"✅ Collected: ₹{st.session_state.goal_progress_kerala:,}")
-st.progress(min(st.session_state.goal_progress_kerala / goal_target, 1.0))
 
-with st.form("add_to_goal_form_kerala"):
-    add_goal_amt = st.number_input("Add to Kerala Goal", min_value=0.0, step=100.0)
-    if st.form_submit_button("Add"):
-        st.session_state.goal_progress_kerala += add_goal_amt
-        st.success(f"Added ₹{add_goal_amt:.2f} to {goal_name}")
+# -----------------------------
+# Trends
+# -----------------------------
+# Built on the trends worker pool from the rollups and cached per ledger
+# version. The script thread never waits on a worker: trends that are
+# already cached are drawn straight away, and the rest stay placeholders in
+# a child fragment that polls the futures every TREND_POLL seconds. Once all
+# of them are done, one app rerun draws the section again without the
+# polling timer.
+TREND_TITLES = {
+    "category_spend": "Rolling Spend by Category",
+    "card_balances": "Card Balances by Month",
+    "savings_rate": "Savings Rate",
+}
+TREND_WAIT = 0.05   # seconds a rerun gives cached trends to resolve
+TREND_POLL = 0.5    # seconds between checks while trends are computing
+
+def draw_trend(name, trend, window):
+    st.markdown(f"**{TREND_TITLES[name]}**")
+    if trend.empty:
+        st.info("Not enough data yet.")
+    elif name == "category_spend":
+        st.line_chart(trend.loc[window])
+    elif name == "card_balances":
+        st.line_chart(trend["balance"])
+        st.bar_chart(trend["change"])
+    else:
+        st.line_chart(trend[["rate", "rate_3m"]])
+
+@profiler.timed()
+def trend_charts(window, polling):
+    futures = st.session_state["trend_futures"]
+    for name in TRENDS:
+        if futures[name].done():
+            draw_trend(name, futures[name].result(), window)
+        else:
+            st.info(f"Computing {TREND_TITLES[name].lower()}...")
+    if polling and all(future.done() for future in futures.values()):
         st.rerun()
 
+@st.fragment
+@profiler.timed()
+def trends_section():
+    st.subheader("Trends")
+    if not has_transactions():
+        st.info("No transactions to analyse yet.")
+        return
+    window = st.radio("Rolling window", [f"{w}m" for w in WINDOWS], horizontal=True, key="trend_window")
+
+    futures = submit_trends()
+    st.session_state["trend_futures"] = futures
+    pending = bool(wait(futures.values(), timeout=TREND_WAIT).not_done)
+    st.fragment(trend_charts, run_every=TREND_POLL if pending else None)(window, pending)
+
+trends_section()
 
 
 # -----------------------------
-# Soft Reset
+# Cache, Connection & Write Queue Statistics
 # -----------------------------
-st.subheader("Reset Transactions")
-if st.button("Reset All Transactions"):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('DELETE FROM transactions')
-    c.execute('UPDATE savings SET amount = 0 WHERE id = 1')
-    conn.commit()
-    conn.close()
-    st.success("All transactions and savings reset!")
-    st.rerun()
+with st.expander("Cache, Connection & Write Queue Statistics"):
+    st.write("Query cache", query_cache.stats())
+    st.write("Connection pool", pool_stats())
+    st.write("Write queue", writer_stats())
 
 
 # -----------------------------
-# Download CSV
+# Profiling
 # -----------------------------
-st.subheader("Download Transactions")
-if not df.empty:
-    csv = df.to_csv(index=False).encode('utf-8')
-    st.download_button("Download CSV File", csv, "transactions.csv", "text/csv")
+# Off unless EXPENSE_PROFILE is set or the box below is ticked. Sections are
+# the dashboard fragments; queries are every SQL statement the data helpers
+# ran, with fetch time and rows included. Whatever "full_rerun" spends beyond
+# the sections is Streamlit itself. The profiler is shared by every session
+# in the process, so it only changes when someone toggles the box; a session
+# that merely reruns with it unticked leaves it as it is.
+profiler.record_section("full_rerun", time.perf_counter() - rerun_started)
+
+def toggle_profiling():
+    profiler.enabled = st.session_state.profiling_enabled
+
+with st.expander("Profiling"):
+    st.checkbox("Record timings", value=profiler.enabled, key="profiling_enabled", on_change=toggle_profiling)
+    snapshot = profiler.snapshot()
+    st.caption(f"Since {datetime.datetime.fromtimestamp(snapshot['since']):%Y-%m-%d %H:%M:%S}")
+    for title, entries, label in [("Sections", snapshot["sections"], "section"), ("SQL statements", snapshot["queries"], "sql")]:
+        st.markdown(f"**{title}**")
+        if entries:
+            st.dataframe(
+                sorted(({label: name, **stats} for name, stats in entries.items()), key=lambda e: -e["total_ms"]),
+                hide_index=True,
+            )
+        else:
+            st.info("Nothing recorded yet.")
+    col1, col2 = st.columns(2)
+    if col1.button("Reset Timings"):
+        profiler.reset()
+        st.rerun()
+    if col2.button("Dump to Log"):
+        st.success(f"Appended to {os.path.abspath(profiler.dump())}")
@@ -0,0 +1,284 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from expense_core import ledger
+from expense_core.db import close_pools, transaction
+from expense_core.exporter import iter_csv
+from expense_core.frames import load_frame
+from expense_core.rollups import totals_by_type, card_totals
+from expense_core.schema import insert_transactions, month_range
+from expense_core.search import search_transactions
+from expense_core.trends import WINDOWS, compute_trends
+from expense_core.writer import close_writers
+from .synthetic import build_ledger, generate_rows, END_DATE
+
+SIZES = [10000, 100000]
+REPEAT = 5
+# The legacy pandas scenarios scan every row in Python; above this size they
+# are skipped unless asked for, since search.apply alone takes minutes.
+LEGACY_MAX_ROWS = 200000
+
+SEARCH_TERM = "costco"
+SELECTED_MONTH = END_DATE.strftime("%Y-%m")
+SELECTED_DATE = END_DATE.isoformat()
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+# Each hot path of the dashboard is timed twice where it changed: "legacy"
+# is the original full-DataFrame pandas code, "current" is what the app runs
+# now. Scenario functions take a context holding the database path and the
+# preloaded legacy DataFrame, and return the number of rows (or bytes) they
+# produced.
+def _full_df(db_file):
+    # Uncached, exactly what every rerun used to pay
+    return ledger._read_sql("SELECT * FROM transactions_view ORDER BY date DESC", db_file=db_file)
+
+
+def get_transactions_legacy(ctx):
+    return len(_full_df(ctx["db"]))
+
+
+def get_transactions_cached(ctx):
+    return len(ledger.get_transactions(ctx["db"]))
+
+
+def frame_bytes_legacy(ctx):
+    # Output is the frame's deep memory footprint rather than a row count
+    return int(_full_df(ctx["db"]).memory_usage(deep=True).sum())
+
+
+def frame_bytes_lean(ctx):
+    frame = load_frame("SELECT * FROM transactions_view ORDER BY date DESC", db_file=ctx["db"])
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def summary_totals_legacy(ctx):
+    df = ctx["df"]
+    df[df["type"] == "Income"]["amount"].sum()
+    df[df["type"] == "Expense"]["amount"].sum()
+    return 2
+
+
+def summary_totals_current(ctx):
+    return len(totals_by_type(db_file=ctx["db"]))
+
+
+def monthly_filter_legacy(ctx):
+    df = ctx["df"]
+    return len(df[df["month"] == SELECTED_MONTH])
+
+
+def monthly_filter_current(ctx):
+    return len(ledger._query_transactions("date BETWEEN ? AND ?", month_range(SELECTED_MONTH), ctx["db"]))
+
+
+def date_filter_legacy(ctx):
+    df = ctx["df"]
+    return len(df[df["date"] == SELECTED_DATE])
+
+
+def date_filter_current(ctx):
+    return len(ledger._query_transactions("date = ?", (SELECTED_DATE,), ctx["db"]))
+
+
+def card_summary_legacy(ctx):
+    df = ctx["df"]
+    cards = 0
+    for card in ledger.DEFAULT_CARDS:
+        df[(df["card"] == card) & (df["type"] == "Expense")]["amount"].sum()
+        df[(df["card"] == card) & (df["type"] == "Repayment")]["amount"].sum()
+        cards += 1
+    return cards
+
+
+def card_summary_current(ctx):
+    return len(card_totals(ctx["db"]))
+
+
+def search_legacy(ctx):
+    df = ctx["df"]
+    return len(df[df.apply(lambda row: SEARCH_TERM in str(row).lower(), axis=1)])
+
+
+def search_current(ctx):
+    return len(search_transactions(SEARCH_TERM, db_file=ctx["db"]))
+
+
+def export_legacy(ctx):
+    return len(ctx["df"].to_csv(index=False).encode("utf-8"))
+
+
+def export_current(ctx):
+    return sum(len(chunk) for chunk in iter_csv(db_file=ctx["db"]))
+
+
+def trends_legacy(ctx):
+    # Filtering the full frame once per month, as a trend view would have to
+    df = ctx["df"]
+    months = sorted(df["month"].unique())
+    spend = [df[(df["month"] == month) & (df["type"] == "Expense")].groupby("category")["amount"].sum()
+             for month in months]
+    for window in WINDOWS:
+        for end in range(len(spend)):
+            sum(spend[max(0, end - window + 1):end + 1])
+    return len(months)
+
+
+def trends_current(ctx):
+    return sum(len(trend) for trend in compute_trends(ctx["db"]).values())
+
+
+def insert_single(ctx):
+    # 100 sidebar-style inserts, one transaction each
+    for row in generate_rows(100, seed=7):
+        ledger.add_transaction(dict(zip(
+            ["type", "date", "amount", "category", "description", "card"], row[:6]
+        )), ctx["db"])
+    return 100
+
+
+def insert_batch(ctx):
+    # 10,000 rows in one executemany transaction, as the importer does
+    with transaction(ctx["db"]) as conn:
+        return insert_transactions(conn, generate_rows(10000, seed=11))
+
+
+SCENARIOS = [
+    ("get_transactions", "legacy", get_transactions_legacy),
+    ("get_transactions", "current", get_transactions_cached),
+    ("frame_bytes", "legacy", frame_bytes_legacy),
+    ("frame_bytes", "lean", frame_bytes_lean),
+    ("summary_totals", "legacy", summary_totals_legacy),
+    ("summary_totals", "current", summary_totals_current),
+    ("monthly_filter", "legacy", monthly_filter_legacy),
+    ("monthly_filter", "current", monthly_filter_current),
+    ("date_filter", "legacy", date_filter_legacy),
+    ("date_filter", "current", date_filter_current),
+    ("card_summary", "legacy", card_summary_legacy),
+    ("card_summary", "current", card_summary_current),
+    ("search", "legacy", search_legacy),
+    ("search", "current", search_current),
+    ("csv_export", "legacy", export_legacy),
+    ("csv_export", "current", export_current),
+    ("trends", "legacy", trends_legacy),
+    ("trends", "current", trends_current),
+    # Writes go last so the read scenarios all see the same ledger
+    ("insert", "single", insert_single),
+    ("insert", "batch", insert_batch),
+]
+
+
+# -----------------------------
+# Harness
+# -----------------------------
+def time_scenario(func, ctx, repeat):
+    timings = []
+    produced = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        produced = func(ctx)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "max_ms": max(timings),
+        "output": produced,
+    }
+
+
+def run_size(rows, repeat, seed, workdir, legacy_max_rows, only=None):
+    db_file = os.path.join(workdir, f"bench_{rows}.db")
+    started = time.perf_counter()
+    build_ledger(db_file, rows, seed)
+    build_seconds = time.perf_counter() - started
+    ctx = {"db": db_file, "df": None}
+
+    results = []
+    for name, variant, func in SCENARIOS:
+        if only and name not in only:
+            continue
+        record = {"scenario": name, "variant": variant, "rows": rows}
+        if variant == "legacy" and rows > legacy_max_rows:
+            record["status"] = "skipped"
+        else:
+            try:
+                if variant == "legacy" and ctx["df"] is None:
+                    ctx["df"] = _full_df(db_file)
+                record.update(time_scenario(func, ctx, 1 if name == "insert" else repeat))
+                record["status"] = "ok"
+            except Exception as exc:
+                record["status"] = "error"
+                record["error"] = f"{type(exc).__name__}: {exc}"
+        results.append(record)
+        print(_format(record), file=sys.stderr)
+
+    close_writers()
+    close_pools()
+    return {"rows": rows, "build_seconds": build_seconds, "db_bytes": os.path.getsize(db_file)}, results
+
+
+def _format(record):
+    label = f"{record['rows']:>9,} {record['scenario']:<18}{record['variant']:<9}"
+    if record["status"] != "ok":
+        return f"{label}{record['status']} {record.get('error', '')}"
+    return f"{label}{record['median_ms']:>10.2f} ms  (min {record['min_ms']:.2f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every dashboard hot path on synthetic ledgers.")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="Ledger sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--legacy-max-rows", type=int, default=LEGACY_MAX_ROWS)
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+    parser.add_argument("--out", help="Write JSON results here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated databases")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="expense_bench_")
+    report = {
+        "meta": {
+            "started": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "ledgers": [],
+        "results": [],
+    }
+    try:
+        for rows in args.rows:
+            ledger_info, results = run_size(rows, args.repeat, args.seed, workdir,
+                                            args.legacy_max_rows, args.scenario)
+            report["ledgers"].append(ledger_info)
+            report["results"].extend(results)
+    finally:
+        if args.keep:
+            print(f"Databases kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import datetime
+import random
+from expense_core.db import transaction
+from expense_core.ledger import DEFAULT_CARDS, DEFAULT_CATEGORIES, create_tables
+from expense_core.schema import insert_transactions
+
+END_DATE = datetime.date(2026, 10, 31)
+BATCH_SIZE = 10000
+
+# (median amount, spread) per category for a lognormal draw, plus how likely
+# the expense is paid by card.
+CATEGORY_PROFILES = {
+    "🧒 Day Care": (900, 0.15, 0.2),
+    "🎓 Education": (120, 0.8, 0.5),
+    "🎮 Entertainment": (35, 0.7, 0.8),
+    "🍽️ Food": (28, 0.6, 0.9),
+    "🛒 Grocery": (85, 0.5, 0.9),
+    "🛡️ Insurance": (210, 0.2, 0.3),
+    "📈 Investments": (500, 0.5, 0.0),
+    "🏥 Medical": (60, 0.9, 0.6),
+    "🧾 Miscellaneous": (25, 1.0, 0.7),
+    "🏠 Rent": (2100, 0.05, 0.0),
+    "🛍️ Shopping": (70, 0.9, 0.9),
+    "🚌 Transportation": (45, 0.6, 0.7),
+    "💡 Utilities": (150, 0.3, 0.5),
+}
+CATEGORY_WEIGHTS = [1, 1, 6, 14, 12, 1, 1, 2, 6, 1, 8, 6, 3]
+DESCRIPTIONS = {
+    "🍽️ Food": ["Tim Hortons", "Swiss Chalet", "Pizza Pizza", "Lunch", "Coffee"],
+    "🛒 Grocery": ["Costco", "Walmart", "No Frills", "FreshCo", "Indian store"],
+    "🛍️ Shopping": ["Amazon", "Winners", "Canadian Tire", "IKEA"],
+    "🚌 Transportation": ["Petro-Canada gas", "Presto top-up", "Esso", "Car wash"],
+}
+# The profiles are written out by hand for readability, so refuse to run
+# once they drift from the categories the app actually seeds.
+if (list(CATEGORY_PROFILES) != DEFAULT_CATEGORIES or len(CATEGORY_WEIGHTS) != len(DEFAULT_CATEGORIES)
+        or not DESCRIPTIONS.keys() <= CATEGORY_PROFILES.keys()):
+    raise RuntimeError("benchmarks.synthetic category profiles do not match ledger.DEFAULT_CATEGORIES")
+
+INCOMES = [("Jobin Salary", 2600, 14), ("Anna Salary", 2300, 14), ("Izaak CCB", 620, 30)]
+
+
+# -----------------------------
+# Synthetic Ledger
+# -----------------------------
+# Yields realistic rows in the (type, date, amount, category, description,
+# card, import_hash) shape insert_transactions takes, newest history last:
+# paycheques on a fixed cadence, daily expenses across the default
+# categories, and a monthly repayment per card of roughly what was spent.
+def generate_rows(count, seed=42, end_date=END_DATE):
+    rng = random.Random(seed)
+    per_day = 12
+    days = max(count // per_day, 30)
+    start = end_date - datetime.timedelta(days=days - 1)
+    categories = list(CATEGORY_PROFILES)
+    card_spend = {card: 0.0 for card in DEFAULT_CARDS}
+    produced = 0
+
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        rows = []
+        for description, amount, every in INCOMES:
+            if offset % every == 0:
+                rows.append(("Income", day, round(rng.gauss(amount, amount * 0.03), 2), "Income", description, "", None))
+        if day.day == 1:
+            for card, spent in card_spend.items():
+                if spent:
+                    paid = round(spent * rng.uniform(0.8, 1.05), 2)
+                    rows.append(("Repayment", day, paid, "Repayment", f"Repayment to {card}", card, None))
+                    card_spend[card] = 0.0
+        while len(rows) < per_day:
+            category = rng.choices(categories, CATEGORY_WEIGHTS)[0]
+            median, spread, card_share = CATEGORY_PROFILES[category]
+            amount = round(median * rng.lognormvariate(0, spread), 2)
+            card = rng.choice(DEFAULT_CARDS) if rng.random() < card_share else ""
+            if card:
+                card_spend[card] += amount
+            description = rng.choice(DESCRIPTIONS.get(category, [""]))
+            rows.append(("Expense", day, amount, category, description, card, None))
+
+        for row in rows:
+            if produced == count:
+                return
+            produced += 1
+            yield row
+
+
+def build_ledger(db_file, count, seed=42):
+    create_tables(db_file)
+    rows = generate_rows(count, seed)
+    with transaction(db_file) as conn:
+        while True:
+            batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+            if not batch:
+                break
+            insert_transactions(conn, batch)
+    return count
@@ -0,0 +1,25 @@
+# Headless core of the Expense Tracker: schema, ledger access, rollups,
+# search, import/export. Importing it pulls in neither Streamlit nor pandas.
+from .db import DB_FILE, connection, transaction, pool_stats
+from .ledger import (
+    DEFAULT_CARDS,
+    DEFAULT_CATEGORIES,
+    create_tables,
+    add_transaction,
+    get_transactions,
+    get_transactions_by_month,
+    get_transactions_by_date,
+    has_transactions,
+    get_categories,
+    delete_transaction,
+    update_transaction,
+    reset_transactions,
+    update_savings,
+    set_savings,
+    get_savings,
+    get_card_limits,
+    get_card_summary,
+    update_card_limit,
+    add_card,
+    remove_card,
+)
@@ -0,0 +1,233 @@
+from .db import DB_FILE, connection
+from .schema import ensure_lookups, to_cents
+from .writer import write
+
+DEFAULT_WARN_RATIO = 0.8
+
+
+# -----------------------------
+# Alert Schema
+# -----------------------------
+# Budgets are per category and month; card thresholds are a ratio of each
+# card's limit. Both are evaluated by triggers as the running totals move:
+# every change to a rollup row re-checks the one budget (category x month)
+# and the one card it belongs to, using card_balances (running spent and
+# repaid per card) instead of rescanning history. alerts only holds what is
+# currently at or over its threshold, so reading it costs O(alerts).
+def create_alerts(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS budgets (
+            category_id INTEGER PRIMARY KEY REFERENCES categories (id),
+            monthly_cents INTEGER NOT NULL,
+            warn_ratio REAL NOT NULL DEFAULT 0.8
+        )
+    ''')
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(card_limits)")]
+    if "alert_ratio" not in columns:
+        conn.execute(f"ALTER TABLE card_limits ADD COLUMN alert_ratio REAL NOT NULL DEFAULT {DEFAULT_WARN_RATIO}")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS card_balances (
+            card_id INTEGER PRIMARY KEY,
+            spent_cents INTEGER NOT NULL DEFAULT 0,
+            repaid_cents INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS alerts (
+            kind TEXT NOT NULL,
+            subject_id INTEGER NOT NULL,
+            month TEXT NOT NULL DEFAULT '',
+            level TEXT NOT NULL,
+            used_cents INTEGER NOT NULL,
+            limit_cents INTEGER NOT NULL,
+            ratio REAL NOT NULL,
+            raised_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (kind, subject_id, month)
+        )
+    ''')
+    # Without the triggers (new database, or rollups rebuilt by a migration)
+    # the running balances and alerts are recomputed once from the rollups
+    fresh = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'rollups_insert_card_alert'"
+    ).fetchone() is None
+    _create_triggers(conn)
+    if fresh:
+        _rebuild(conn)
+
+
+def _budget_sql(where, delete_where):
+    return f'''
+            DELETE FROM alerts WHERE kind = 'budget' AND {delete_where};
+            INSERT INTO alerts (kind, subject_id, month, level, used_cents, limit_cents, ratio)
+            SELECT 'budget', b.category_id, r.month,
+                   CASE WHEN SUM(r.total_cents) >= b.monthly_cents THEN 'exceeded' ELSE 'warning' END,
+                   SUM(r.total_cents), b.monthly_cents, SUM(r.total_cents) * 1.0 / b.monthly_cents
+            FROM budgets b JOIN rollups r ON r.category_id = b.category_id AND r.type = 'Expense'
+            WHERE {where} AND b.monthly_cents > 0
+            GROUP BY b.category_id, r.month
+            HAVING SUM(r.total_cents) >= b.monthly_cents * b.warn_ratio;'''
+
+
+def _card_sql(where, delete_where):
+    return f'''
+            DELETE FROM alerts WHERE kind = 'card' AND {delete_where};
+            INSERT INTO alerts (kind, subject_id, month, level, used_cents, limit_cents, ratio)
+            SELECT 'card', k.id, '',
+                   CASE WHEN b.spent_cents - b.repaid_cents >= l.limit_cents THEN 'exceeded' ELSE 'warning' END,
+                   b.spent_cents - b.repaid_cents, l.limit_cents,
+                   (b.spent_cents - b.repaid_cents) * 1.0 / l.limit_cents
+            FROM cards k
+            JOIN (SELECT card, CAST(ROUND(max_limit * 100) AS INTEGER) AS limit_cents, alert_ratio
+                  FROM card_limits) l ON l.card = k.name
+            JOIN card_balances b ON b.card_id = k.id
+            WHERE {where} AND l.limit_cents > 0
+              AND b.spent_cents - b.repaid_cents >= l.limit_cents * l.alert_ratio;'''
+
+
+def _balance_sql(row, sign, base=None):
+    # Adds (sign=1) or removes (sign=-1) a rollup row's total from its card,
+    # or applies the NEW - base difference for updates
+    delta = f"{row}.total_cents" if base is None else f"({row}.total_cents - {base}.total_cents)"
+    return f'''
+            INSERT INTO card_balances (card_id, spent_cents, repaid_cents)
+            VALUES ({row}.card_id,
+                    CASE WHEN {row}.type = 'Expense' THEN {sign} * {delta} ELSE 0 END,
+                    CASE WHEN {row}.type = 'Repayment' THEN {sign} * {delta} ELSE 0 END)
+            ON CONFLICT (card_id) DO UPDATE
+            SET spent_cents = spent_cents + excluded.spent_cents,
+                repaid_cents = repaid_cents + excluded.repaid_cents;'''
+
+
+def _create_triggers(conn):
+    for event, row, balance in [
+        ("INSERT", "NEW", _balance_sql("NEW", 1)),
+        ("UPDATE", "NEW", _balance_sql("NEW", 1, base="OLD")),
+        ("DELETE", "OLD", _balance_sql("OLD", -1)),
+    ]:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS rollups_{event.lower()}_budget_alert
+            AFTER {event} ON rollups WHEN {row}.type = 'Expense'
+            BEGIN
+                {_budget_sql(f"b.category_id = {row}.category_id AND r.month = {row}.month",
+                             f"subject_id = {row}.category_id AND month = {row}.month")}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS rollups_{event.lower()}_card_alert
+            AFTER {event} ON rollups WHEN {row}.card_id <> 0 AND {row}.type IN ('Expense', 'Repayment')
+            BEGIN
+                {balance}
+                {_card_sql(f"k.id = {row}.card_id", f"subject_id = {row}.card_id")}
+            END
+        ''')
+        if event != "DELETE":
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS budgets_{event.lower()}_alert
+                AFTER {event} ON budgets
+                BEGIN
+                    {_budget_sql("b.category_id = NEW.category_id", "subject_id = NEW.category_id")}
+                END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS card_limits_{event.lower()}_alert
+                AFTER {event} ON card_limits
+                BEGIN
+                    {_card_sql("k.name = NEW.card", "subject_id = (SELECT id FROM cards WHERE name = NEW.card)")}
+                END
+            ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS budgets_delete_alert
+        AFTER DELETE ON budgets
+        BEGIN
+            DELETE FROM alerts WHERE kind = 'budget' AND subject_id = OLD.category_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS card_limits_delete_alert
+        AFTER DELETE ON card_limits
+        BEGIN
+            DELETE FROM alerts WHERE kind = 'card' AND subject_id = (SELECT id FROM cards WHERE name = OLD.card);
+        END
+    ''')
+
+
+def _rebuild(conn):
+    conn.execute("DELETE FROM card_balances")
+    conn.execute('''
+        INSERT INTO card_balances (card_id, spent_cents, repaid_cents)
+        SELECT card_id,
+               SUM(CASE WHEN type = 'Expense' THEN total_cents ELSE 0 END),
+               SUM(CASE WHEN type = 'Repayment' THEN total_cents ELSE 0 END)
+        FROM rollups WHERE card_id <> 0 AND type IN ('Expense', 'Repayment')
+        GROUP BY card_id
+    ''')
+    for statement in (_budget_sql("1", "1") + _card_sql("1", "1")).split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+# -----------------------------
+# Budgets & Thresholds
+# -----------------------------
+def _set_budget(conn, category, amount, warn_ratio):
+    ensure_lookups(conn, [category])
+    conn.execute('''
+        INSERT INTO budgets (category_id, monthly_cents, warn_ratio)
+        VALUES ((SELECT id FROM categories WHERE name = ?), ?, ?)
+        ON CONFLICT (category_id) DO UPDATE
+        SET monthly_cents = excluded.monthly_cents, warn_ratio = excluded.warn_ratio
+    ''', (category, to_cents(amount), warn_ratio))
+
+
+def set_budget(category, amount, warn_ratio=DEFAULT_WARN_RATIO, db_file=DB_FILE):
+    write(db_file, _set_budget, category, amount, warn_ratio)
+
+
+def _remove_budget(conn, category):
+    return conn.execute(
+        "DELETE FROM budgets WHERE category_id = (SELECT id FROM categories WHERE name = ?)", (category,)
+    ).rowcount
+
+
+def remove_budget(category, db_file=DB_FILE):
+    return write(db_file, _remove_budget, category)
+
+
+def _set_card_alert_ratio(conn, card, ratio):
+    return conn.execute("UPDATE card_limits SET alert_ratio = ? WHERE card = ?", (ratio, card)).rowcount
+
+
+def set_card_alert_ratio(card, ratio, db_file=DB_FILE):
+    return write(db_file, _set_card_alert_ratio, card, ratio)
+
+
+def get_budgets(db_file=DB_FILE):
+    with connection(db_file) as conn:
+        return conn.execute('''
+            SELECT c.name, b.monthly_cents / 100.0, b.warn_ratio
+            FROM budgets b JOIN categories c ON c.id = b.category_id
+            ORDER BY c.name
+        ''').fetchall()
+
+
+# -----------------------------
+# Alerts
+# -----------------------------
+def get_alerts(month=None, db_file=DB_FILE):
+    # Card alerts always; budget alerts for month, or every month when None
+    sql = '''
+        SELECT a.kind, COALESCE(c.name, k.name, '') AS subject, a.month, a.level,
+               a.used_cents / 100.0 AS used, a.limit_cents / 100.0 AS "limit", a.ratio, a.raised_at
+        FROM alerts a
+        LEFT JOIN categories c ON a.kind = 'budget' AND c.id = a.subject_id
+        LEFT JOIN cards k ON a.kind = 'card' AND k.id = a.subject_id
+    '''
+    params = ()
+    if month is not None:
+        sql += " WHERE a.kind = 'card' OR a.month = ?"
+        params = (month,)
+    sql += " ORDER BY a.level = 'exceeded' DESC, a.ratio DESC"
+    with connection(db_file) as conn:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
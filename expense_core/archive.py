@@ -0,0 +1,83 @@
+import datetime
+from .db import DB_FILE, connection
+from .writer import write
+
+KEEP_MONTHS = 2     # the current month and the one before stay hot
+HOT_VIEW = "transactions_view"
+ALL_VIEW = "transactions_all_view"
+
+
+# -----------------------------
+# Partition Selection
+# -----------------------------
+# Readers use the hot view unless the range they ask for reaches back to
+# the newest archived date. MAX(date) is a single seek on the archive's date
+# index, and stays exact even if an archived row is later re-dated.
+def archived_through(conn):
+    return conn.execute("SELECT MAX(date) FROM transactions_archive").fetchone()[0]
+
+
+def source_view(conn, start_date=None, include_archive=False):
+    if include_archive:
+        return ALL_VIEW
+    if start_date is None:
+        return HOT_VIEW
+    last = archived_through(conn)
+    return ALL_VIEW if last is not None and str(start_date) <= last else HOT_VIEW
+
+
+def archive_cutoff(keep_months=KEEP_MONTHS, today=None):
+    # First day of the oldest month that stays hot
+    today = today or datetime.date.today()
+    month = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+# -----------------------------
+# Archiving
+# -----------------------------
+# Rows keep their ids when moved, so links such as the edit grid's id column
+# stay valid. The rollup and search triggers on both tables cancel out, and
+# nothing is recomputed. Rows are deleted from the source before they are
+# inserted into the target, since the search index cannot hold one id twice.
+COLUMNS = "id, type, date, amount_cents, category_id, card_id, description, import_hash"
+
+
+def _move(conn, source, target, where, params):
+    conn.execute("DROP TABLE IF EXISTS temp.moving_rows")
+    conn.execute(f"CREATE TEMP TABLE moving_rows AS SELECT {COLUMNS} FROM {source} WHERE {where}", params)
+    conn.execute(f"DELETE FROM {source} WHERE {where}", params)
+    moved = conn.execute(f"INSERT INTO {target} ({COLUMNS}) SELECT {COLUMNS} FROM temp.moving_rows").rowcount
+    conn.execute("DROP TABLE temp.moving_rows")
+    return moved
+
+
+def _archive_before(conn, cutoff):
+    return _move(conn, "transactions", "transactions_archive", "date < ?", (cutoff,))
+
+
+def archive_closed_months(keep_months=KEEP_MONTHS, today=None, db_file=DB_FILE):
+    # Returns the number of rows moved out of the hot partition
+    return write(db_file, _archive_before, archive_cutoff(keep_months, today).isoformat())
+
+
+def _restore_from(conn, start):
+    return _move(conn, "transactions_archive", "transactions", "date >= ?", (start,))
+
+
+def restore_archived(start_date, db_file=DB_FILE):
+    # Moves archived rows dated start_date or later back into the hot partition
+    return write(db_file, _restore_from, str(start_date))
+
+
+def archive_stats(db_file=DB_FILE):
+    with connection(db_file) as conn:
+        hot = conn.execute("SELECT COUNT(*), MIN(date) FROM transactions").fetchone()
+        archived = conn.execute("SELECT COUNT(*), MIN(date), MAX(date) FROM transactions_archive").fetchone()
+    return {
+        "hot_rows": hot[0],
+        "hot_from": hot[1],
+        "archived_rows": archived[0],
+        "archived_from": archived[1],
+        "archived_through": archived[2],
+    }
@@ -0,0 +1,151 @@
+import datetime
+import os
+import sqlite3
+from .db import DB_FILE, BUSY_TIMEOUT, connection, data_versions
+from .writer import write_exclusive
+
+BACKUP_DIR = "backups"  # next to the database file
+KEEP_BACKUPS = 7        # newest snapshots kept per label
+BACKUP_PAGES = 1024     # pages copied per step
+BACKUP_SLEEP = 0.005    # seconds between steps
+LABELS = ["manual", "reset"]
+
+
+# -----------------------------
+# Snapshots
+# -----------------------------
+# Snapshots use SQLite's online backup API. A pooled connection copies
+# BACKUP_PAGES pages at a time and sleeps between steps. In WAL mode it only
+# holds a read snapshot, so queued writes keep committing while it runs. A
+# commit from another connection makes the next step start over, so a
+# snapshot always matches one committed state. Files are named
+# <db>.<timestamp>.<label>.db and are written to a .part file first, so a
+# half-finished copy is never listed.
+def backup_dir(db_file=DB_FILE):
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), BACKUP_DIR)
+
+
+def _snapshot_path(db_file, label):
+    stem = os.path.splitext(os.path.basename(db_file))[0]
+    taken = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return os.path.join(backup_dir(db_file), f"{stem}.{taken}.{label}.db")
+
+
+def take_snapshot(db_file=DB_FILE, label="manual", pages=BACKUP_PAGES, sleep=BACKUP_SLEEP, progress=None):
+    # progress(status, remaining, total) is called after every step
+    os.makedirs(backup_dir(db_file), exist_ok=True)
+    path = _snapshot_path(db_file, label)
+    with connection(db_file) as conn:
+        target = sqlite3.connect(path + ".part")
+        try:
+            conn.backup(target, pages=pages, sleep=sleep, progress=progress)
+        finally:
+            target.close()
+    os.replace(path + ".part", path)
+    prune_backups(db_file)
+    return path
+
+
+def list_backups(db_file=DB_FILE, label=None):
+    # Newest first
+    stem = os.path.splitext(os.path.basename(db_file))[0]
+    folder = backup_dir(db_file)
+    if not os.path.isdir(folder):
+        return []
+    backups = []
+    for name in os.listdir(folder):
+        parts = name.split(".")
+        if len(parts) != 4 or parts[0] != stem or parts[3] != "db" or parts[2] not in LABELS:
+            continue
+        if label is not None and parts[2] != label:
+            continue
+        path = os.path.join(folder, name)
+        backups.append({
+            "path": path,
+            "label": parts[2],
+            "taken_at": datetime.datetime.strptime(parts[1], "%Y%m%d-%H%M%S-%f"),
+            "bytes": os.path.getsize(path),
+        })
+    return sorted(backups, key=lambda b: b["taken_at"], reverse=True)
+
+
+def prune_backups(db_file=DB_FILE, keep=KEEP_BACKUPS):
+    # Keeps the newest `keep` snapshots of each label; returns how many were removed
+    removed = 0
+    for label in LABELS:
+        for old in list_backups(db_file, label)[keep:]:
+            os.remove(old["path"])
+            removed += 1
+    return removed
+
+
+# -----------------------------
+# Restore
+# -----------------------------
+# A restore is an exclusive queued write, so every write queued before it
+# has committed and none queued after it starts until it is done. The copy
+# runs one page per step: the first step takes the write lock on the live
+# database and holds it until the last page, which commits everything as
+# one transaction, so other connections see either the old database or the
+# restored one. The data versions are read once that lock is held, and an
+# undo whose reset is no longer the last write stops there, before the copy
+# commits. The version counters then move past both their live and snapshot
+# values. Otherwise a cache entry keyed on a restored version could match
+# data that no longer exists.
+class _WrittenSince(Exception):
+    pass
+
+
+def _restore(path, db_file, versions=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    before = None
+
+    def locked(status, remaining, total):
+        nonlocal before
+        if before is None:
+            with connection(db_file) as conn:
+                before = data_versions(conn)
+            if versions is not None and before != versions:
+                raise _WrittenSince()
+
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        try:
+            source.backup(target, pages=1, progress=locked)
+        except _WrittenSince:
+            return False
+        restored = data_versions(target)
+        target.executemany("UPDATE data_versions SET version = ? WHERE name = ?", [
+            (max(version, before.get(name, 0)) + 1, name) for name, version in restored.items()
+        ])
+    finally:
+        source.close()
+        target.close()
+    return True
+
+
+def restore_backup(path, db_file=DB_FILE):
+    write_exclusive(db_file, _restore, path, db_file)
+
+
+# A reset can only be undone with the snapshot it returned, and only while
+# the data versions are still the ones it left behind. Once anything else
+# has been written, restoring would silently drop that write, so the undo is
+# refused rather than walking back to an older reset. reset_undoable() is
+# only a hint for whether to offer the undo; undo_reset() checks again under
+# the write lock.
+def reset_undoable(snapshot, versions, db_file=DB_FILE):
+    if not os.path.exists(snapshot):
+        return False
+    with connection(db_file) as conn:
+        return data_versions(conn) == versions
+
+
+def undo_reset(snapshot, versions, db_file=DB_FILE):
+    # Returns False, leaving the database alone, when the reset can no longer be undone
+    if not os.path.exists(snapshot) or not write_exclusive(db_file, _restore, snapshot, db_file, versions):
+        return False
+    os.remove(snapshot)
+    return True
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 16
+MAX_BYTES = 64 * 1024 * 1024
+
+
+# -----------------------------
+# Version-keyed Read Cache
+# -----------------------------
+# LRU cache of query results keyed on (key, data version). Loading a newer
+# version of a key evicts the older ones, and entries are dropped
+# least-recently-used first once either bound is exceeded. Cached DataFrames
+# are shared between reruns, so callers must not mutate them in place.
+class VersionedCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, version, loader):
+        with self._lock:
+            entry = self._entries.get((key, version))
+            if entry is not None:
+                self._entries.move_to_end((key, version))
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = loader()
+        size = _sizeof(value)
+
+        with self._lock:
+            for stale in [k for k in self._entries if k[0] == key and k[1] != version]:
+                self._drop(stale)
+            if (key, version) in self._entries:
+                self._drop((key, version))
+            self._entries[(key, version)] = (value, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+        return value
+
+    def _drop(self, entry_key):
+        _, size = self._entries.pop(entry_key)
+        self._bytes -= size
+        self.evictions += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            for entry_key in [k for k in self._entries if key is None or k[0] == key]:
+                self._drop(entry_key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _sizeof(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    return 0
+
+
+query_cache = VersionedCache()
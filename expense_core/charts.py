@@ -0,0 +1,63 @@
+import hashlib
+import io
+from .cache import VersionedCache
+
+# Rendered images keyed on the content hash of the aggregate they show, so a
+# chart is drawn once per data change rather than once per rerun.
+chart_cache = VersionedCache(max_entries=8, max_bytes=8 * 1024 * 1024)
+
+
+def aggregate_hash(totals):
+    items = sorted((str(k), round(float(v), 2)) for k, v in totals.items())
+    return hashlib.sha1(repr(items).encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Native (Vega-Lite) Renderer
+# -----------------------------
+def pie_spec(totals):
+    total = sum(totals.values()) or 1
+    return {
+        "data": {"values": [
+            {"category": k, "amount": v, "share": v / total} for k, v in totals.items()
+        ]},
+        "mark": {"type": "arc", "tooltip": True},
+        "encoding": {
+            "theta": {"field": "amount", "type": "quantitative", "stack": True},
+            "color": {"field": "category", "type": "nominal"},
+            "tooltip": [
+                {"field": "category", "type": "nominal"},
+                {"field": "amount", "type": "quantitative", "format": ",.2f"},
+                {"field": "share", "type": "quantitative", "format": ".1%"},
+            ],
+        },
+        "view": {"stroke": None},
+    }
+
+
+# -----------------------------
+# Matplotlib Renderer
+# -----------------------------
+def _render_pie_png(totals, size):
+    # Imported lazily so matplotlib only costs startup time when used. Figure
+    # is used instead of pyplot so nothing is registered in pyplot's global
+    # figure list, and the figure is released as soon as it is rendered.
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(size, size))
+    try:
+        ax = fig.subplots()
+        ax.pie(list(totals.values()), labels=list(totals.keys()), autopct='%1.1f%%')
+        ax.set_ylabel("")
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def pie_png(totals, size=4):
+    return chart_cache.get_or_load(
+        ("pie", size), aggregate_hash(totals), lambda: _render_pie_png(totals, size)
+    )
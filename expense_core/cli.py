@@ -0,0 +1,229 @@
+import argparse
+import datetime
+import sys
+from .db import DB_FILE
+from .ledger import create_tables, add_transaction
+from .importer import CHUNK_SIZE, DEFAULT_EXPENSE_CATEGORY, PRESETS, import_statement
+from .rollups import totals_by_type, totals_by_category, card_totals, rebuild_rollups, verify_rollups
+from .exporter import WRITERS
+from .recurring import FREQUENCIES, add_schedule, get_schedules, materialize
+from .archive import KEEP_MONTHS, archive_closed_months, archive_cutoff, archive_stats, restore_archived
+from .alerts import DEFAULT_WARN_RATIO, get_alerts, set_budget
+from .backup import list_backups, restore_backup, take_snapshot
+from .schema import month_key, month_label
+from .profiling import PROFILE_LOG, profiler
+
+# Kept free of Streamlit, pandas and matplotlib so cron jobs and scripts
+# start fast; pyarrow is only imported by the Parquet/Arrow exports.
+
+
+def cmd_add(args):
+    add_transaction({
+        "type": args.type,
+        "date": args.date,
+        "amount": args.amount,
+        "category": args.category or (DEFAULT_EXPENSE_CATEGORY if args.type == "Expense" else args.type),
+        "description": args.description,
+        "card": args.card,
+    }, db_file=args.db)
+    print(f"Added {args.type} of {args.amount:,.2f} on {args.date}.")
+
+
+def cmd_import(args):
+    result = import_statement(args.file, fmt=args.format, preset=args.preset, card=args.card,
+                              chunk_size=args.chunk_size, db_file=args.db)
+    print(f"Read {result['read']} rows, inserted {result['inserted']}, skipped {result['duplicates']} duplicates "
+          f"in {result['seconds']:.2f}s ({result['rows_per_second']:,.0f} rows/s).")
+
+
+def cmd_report(args):
+    month = args.month
+    totals = totals_by_type(month, db_file=args.db)
+    income = totals.get("Income", 0)
+    expense = totals.get("Expense", 0)
+    print(month_label(month) if month else "All time")
+    print(f"  {'Income':<24}{income:>14,.2f}")
+    print(f"  {'Expenses':<24}{expense:>14,.2f}")
+    print(f"  {'Balance':<24}{income - expense:>14,.2f}")
+    categories = totals_by_category("Expense", month, db_file=args.db)
+    if categories:
+        print("Expenses by category")
+        for category, amount in sorted(categories.items(), key=lambda kv: -kv[1]):
+            print(f"  {category:<24}{amount:>14,.2f}")
+
+
+def cmd_cards(args):
+    print(f"{'Card':<16}{'Limit':>12}{'Spent':>12}{'Repaid':>12}{'Outstanding':>14}{'Available':>12}")
+    for card, limit, spent, repaid in card_totals(args.db):
+        outstanding = spent - repaid
+        print(f"{card:<16}{limit:>12,.2f}{spent:>12,.2f}{repaid:>12,.2f}{outstanding:>14,.2f}{limit - outstanding:>12,.2f}")
+
+
+def cmd_export(args):
+    with open(args.output, "wb") as dest:
+        WRITERS[args.format](dest, db_file=args.db, start_date=args.start_date,
+                             end_date=args.end_date, card=args.card, month=args.month)
+    print(f"Wrote {args.output}")
+
+
+def cmd_recurring(args):
+    result = materialize(args.until, db_file=args.db)
+    print(f"{result['due']} occurrences due, inserted {result['inserted']}, "
+          f"skipped {result['duplicates']} already recorded.")
+
+
+def cmd_schedules(args):
+    if args.add:
+        add_schedule(args.add, args.type, args.amount, args.category, args.description, args.card,
+                     args.frequency, args.start_date, args.end_date, db_file=args.db)
+    print(f"{'Name':<24}{'Type':<11}{'Amount':>12}  {'Every':<10}{'Next':<12}")
+    for s in get_schedules(args.db):
+        status = "" if s["active"] else "  (paused)"
+        print(f"{s['name']:<24}{s['type']:<11}{s['amount']:>12,.2f}  {s['frequency']:<10}{s['next_date']:<12}{status}")
+
+
+def cmd_archive(args):
+    if args.restore_from:
+        print(f"Restored {restore_archived(args.restore_from, db_file=args.db)} rows.")
+    else:
+        moved = archive_closed_months(args.keep_months, db_file=args.db)
+        print(f"Archived {moved} rows dated before {archive_cutoff(args.keep_months)}.")
+    stats = archive_stats(args.db)
+    print(f"Hot: {stats['hot_rows']:,} rows; archive: {stats['archived_rows']:,} rows "
+          f"through {stats['archived_through'] or '-'}.")
+
+
+def cmd_rollups(args):
+    if not args.verify_only:
+        print(f"Rebuilt {rebuild_rollups(args.db)} rollup rows.")
+    mismatches = verify_rollups(args.db)
+    for m in mismatches:
+        print(f"Mismatch {m['key']}: expected {m['expected']}, stored {m['stored']}")
+    print("Rollups OK." if not mismatches else f"{len(mismatches)} mismatched rollup rows.")
+    return 1 if mismatches else 0
+
+
+def cmd_alerts(args):
+    if args.budget:
+        set_budget(args.budget, args.amount, args.warn, db_file=args.db)
+    for alert in get_alerts(args.month, args.db):
+        where = f" {alert['month']}" if alert["month"] else ""
+        print(f"{alert['level']:<9}{alert['kind']:<7}{alert['subject']}{where}: "
+              f"{alert['used']:,.2f} of {alert['limit']:,.2f} ({alert['ratio']:.0%})")
+
+
+def cmd_backup(args):
+    if args.restore:
+        restore_backup(args.restore, args.db)
+        print(f"Restored {args.restore}.")
+    elif args.list:
+        for b in list_backups(args.db):
+            print(f"{b['taken_at']:%Y-%m-%d %H:%M:%S}  {b['label']:<7}{b['bytes']:>12,}  {b['path']}")
+    else:
+        print(f"Snapshot written to {take_snapshot(args.db)}.")
+
+
+def month_arg(value):
+    # "YYYY-MM", checked as a real month
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a month as YYYY-MM, got {value!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="expense_core", description="Expense Tracker command line.")
+    parser.add_argument("--db", default=DB_FILE, help="SQLite database file")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time every SQL statement and append the results to the profile log")
+    parser.add_argument("--profile-log", default=PROFILE_LOG, metavar="LOG",
+                        help=f"Log file for --profile (default {PROFILE_LOG})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Record a transaction")
+    add.add_argument("amount", type=float)
+    add.add_argument("--type", choices=["Expense", "Income", "Repayment"], default="Expense")
+    add.add_argument("--category", default="")
+    add.add_argument("--description", default="")
+    add.add_argument("--card", default="")
+    add.add_argument("--date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    add.set_defaults(func=cmd_add)
+
+    imp = commands.add_parser("import", help="Import a CSV, OFX or QFX statement")
+    imp.add_argument("file")
+    imp.add_argument("--preset", choices=sorted(PRESETS), default="generic")
+    imp.add_argument("--format", choices=["csv", "ofx"], default=None)
+    imp.add_argument("--card", default="", help="Card the statement belongs to (empty for bank accounts)")
+    imp.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    imp.set_defaults(func=cmd_import)
+
+    report = commands.add_parser("report", help="Income, expense and category totals")
+    report.add_argument("--month", help="YYYY-MM; all time when omitted", type=month_arg)
+    report.set_defaults(func=cmd_report)
+
+    cards = commands.add_parser("cards", help="Credit card balances and available credit")
+    cards.set_defaults(func=cmd_cards)
+
+    export = commands.add_parser("export", help="Export transactions to CSV, Parquet or Arrow")
+    export.add_argument("output")
+    export.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    export.add_argument("--start-date")
+    export.add_argument("--end-date")
+    export.add_argument("--card")
+    export.add_argument("--month", type=month_arg)
+    export.set_defaults(func=cmd_export)
+    recurring = commands.add_parser("recurring", help="Write every due recurring transaction (safe to re-run)")
+    recurring.add_argument("--until", type=datetime.date.fromisoformat, default=datetime.date.today())
+    recurring.set_defaults(func=cmd_recurring)
+
+    schedules = commands.add_parser("schedules", help="List recurring schedules, optionally adding one")
+    schedules.add_argument("--add", metavar="NAME", help="Add a schedule with this name")
+    schedules.add_argument("--amount", type=float, default=0.0)
+    schedules.add_argument("--type", choices=["Expense", "Income", "Repayment"], default="Expense")
+    schedules.add_argument("--category", default="")
+    schedules.add_argument("--description", default="")
+    schedules.add_argument("--card", default="")
+    schedules.add_argument("--frequency", choices=FREQUENCIES, default="monthly")
+    schedules.add_argument("--start-date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    schedules.add_argument("--end-date", type=datetime.date.fromisoformat)
+    schedules.set_defaults(func=cmd_schedules)
+
+    archive = commands.add_parser("archive", help="Move closed months out of the hot transactions table")
+    archive.add_argument("--keep-months", type=int, default=KEEP_MONTHS, help="Months kept hot, counting the current one")
+    archive.add_argument("--restore-from", type=datetime.date.fromisoformat,
+                         help="Instead, move archived rows from this date on back to the hot table")
+    archive.set_defaults(func=cmd_archive)
+
+    rollups = commands.add_parser("rollups", help="Rebuild or verify the dashboard rollup table")
+    rollups.add_argument("--verify-only", action="store_true", help="Compare rollups with the ledger without rebuilding")
+    rollups.set_defaults(func=cmd_rollups)
+
+    alerts = commands.add_parser("alerts", help="Budget and card-limit alerts, optionally setting a budget")
+    alerts.add_argument("--month", type=month_arg, default=month_key(datetime.date.today()),
+                        help="YYYY-MM for budget alerts (default this month)")
+    alerts.add_argument("--budget", metavar="CATEGORY", help="Set the monthly budget of this category")
+    alerts.add_argument("--amount", type=float, default=0.0)
+    alerts.add_argument("--warn", type=float, default=DEFAULT_WARN_RATIO, help="Warn at this fraction of the budget")
+    alerts.set_defaults(func=cmd_alerts)
+
+    backup = commands.add_parser("backup", help="Take an online snapshot, or list/restore snapshots")
+    backup.add_argument("--list", action="store_true", help="List snapshots instead of taking one")
+    backup.add_argument("--restore", metavar="SNAPSHOT", help="Replace the database with this snapshot")
+    backup.set_defaults(func=cmd_backup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        profiler.enabled = True
+    create_tables(args.db)
+    with profiler.section(args.command):
+        status = args.func(args)
+    if args.profile:
+        print(f"Profile appended to {profiler.dump(args.profile_log)}", file=sys.stderr)
+    return status or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+from .profiling import ProfiledConnection
+
+DB_FILE = "expense_data.db"
+
+# Applied once to every pooled connection when it is opened
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # ~16 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory map
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+]
+
+BUSY_TIMEOUT = 10.0
+POOL_SIZE = 4
+
+
+# -----------------------------
+# Connection Pool
+# -----------------------------
+class ConnectionPool:
+    def __init__(self, db_file=DB_FILE, size=POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._transactions = 0
+        self._rollbacks = 0
+
+    def _open(self):
+        # Connections are handed to one thread at a time by the pool,
+        # so sharing them across Streamlit's script threads is safe.
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,
+            factory=ProfiledConnection,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+            self._waits += 1
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        with self._lock:
+            self._checkouts += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front so concurrent writers
+        # wait on busy_timeout instead of failing mid-transaction.
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                with self._lock:
+                    self._rollbacks += 1
+                raise
+            else:
+                conn.commit()
+                with self._lock:
+                    self._transactions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_file": self.db_file,
+                "size": self.size,
+                "opened": self._opened,
+                "idle": self._idle.qsize(),
+                "in_use": self._opened - self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "transactions": self._transactions,
+                "rollbacks": self._rollbacks,
+            }
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file=DB_FILE):
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None:
+            pool = _pools[db_file] = ConnectionPool(db_file)
+        return pool
+
+
+def connection(db_file=DB_FILE):
+    return get_pool(db_file).connection()
+
+
+def transaction(db_file=DB_FILE):
+    return get_pool(db_file).transaction()
+
+
+def pool_stats(db_file=DB_FILE):
+    return get_pool(db_file).stats()
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+# -----------------------------
+# Data Versions
+# -----------------------------
+# Each tracked name has a counter bumped by triggers on every write to its
+# tables, so readers can tell whether anything changed without rescanning,
+# and an undo can tell whether anything was written since its snapshot.
+VERSIONED_TABLES = {
+    "transactions": ["transactions", "transactions_archive"],
+    "savings": ["savings"],
+    "card_limits": ["card_limits"],
+    "budgets": ["budgets"],
+    "schedules": ["recurring_schedules"],
+}
+
+
+def create_version_triggers(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for name, tables in VERSIONED_TABLES.items():
+        conn.execute('INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)', (name,))
+        for table in tables:
+            for event in ["INSERT", "UPDATE", "DELETE"]:
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE data_versions SET version = version + 1 WHERE name = '{name}';
+                    END
+                ''')
+
+
+def data_versions(conn):
+    return dict(conn.execute('SELECT name, version FROM data_versions'))
+
+
+def data_version(name, db_file=DB_FILE):
+    with connection(db_file) as conn:
+        row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,131 @@
+import csv
+import io
+import os
+import tempfile
+from .db import DB_FILE, connection
+from .archive import ALL_VIEW, source_view
+from .schema import month_range
+
+CHUNK_SIZE = 5000
+EXPORT_COLUMNS = ["id", "type", "date", "month", "amount", "category", "description", "card"]
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+}
+
+
+# -----------------------------
+# Export Query
+# -----------------------------
+def export_query(start_date=None, end_date=None, card=None, month=None, view=ALL_VIEW):
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append("date <= ?")
+        params.append(str(end_date))
+    if card:
+        clauses.append("card = ?")
+        params.append(card)
+    if month:
+        clauses.append("date BETWEEN ? AND ?")
+        params.extend(month_range(month))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {', '.join(EXPORT_COLUMNS)} FROM {view}{where} ORDER BY date DESC, id DESC", params
+
+
+def iter_row_chunks(chunk_size=CHUNK_SIZE, db_file=DB_FILE, **filters):
+    # Rows are pulled from the cursor chunk by chunk, so only one chunk is
+    # ever in memory regardless of ledger size.
+    with connection(db_file) as conn:
+        # An export without a lower bound covers the whole history
+        start = month_range(filters["month"])[0] if filters.get("month") else filters.get("start_date")
+        sql, params = export_query(**filters, view=source_view(conn, start, include_archive=start is None))
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def iter_csv(chunk_size=CHUNK_SIZE, db_file=DB_FILE, **filters):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in iter_row_chunks(chunk_size, db_file, **filters):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_csv(dest, chunk_size=CHUNK_SIZE, db_file=DB_FILE, **filters):
+    for data in iter_csv(chunk_size, db_file, **filters):
+        dest.write(data)
+
+
+def _arrow_batches(pa, schema, chunk_size, db_file, filters):
+    for rows in iter_row_chunks(chunk_size, db_file, **filters):
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema
+        )
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()), ("type", pa.string()), ("date", pa.string()), ("month", pa.string()),
+        ("amount", pa.float64()), ("category", pa.string()), ("description", pa.string()), ("card", pa.string()),
+    ])
+
+
+def write_parquet(dest, chunk_size=CHUNK_SIZE, db_file=DB_FILE, **filters):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa)
+    with pq.ParquetWriter(dest, schema) as writer:
+        for batch in _arrow_batches(pa, schema, chunk_size, db_file, filters):
+            writer.write_batch(batch)
+
+
+def write_arrow(dest, chunk_size=CHUNK_SIZE, db_file=DB_FILE, **filters):
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    with pa.ipc.new_file(dest, schema) as writer:
+        for batch in _arrow_batches(pa, schema, chunk_size, db_file, filters):
+            writer.write_batch(batch)
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "arrow": write_arrow}
+
+
+def available_formats():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return ["csv"]
+    return list(FORMATS)
+
+
+def export_to_file(fmt="csv", chunk_size=CHUNK_SIZE, db_file=DB_FILE, directory=None, **filters):
+    # Writes the export to a temporary file (in directory, or the system temp
+    # directory) and returns its path; the caller owns the file and removes
+    # it when done.
+    fd, path = tempfile.mkstemp(prefix="transactions_", suffix=FORMATS[fmt][1], dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as dest:
+            WRITERS[fmt](dest, chunk_size, db_file, **filters)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,80 @@
+from .db import DB_FILE, connection
+
+# pandas is imported inside the loaders only, like the other readers.
+
+TRANSACTION_TYPES = ["Expense", "Income", "Repayment"]
+FRAME_COLUMNS = ["id", "type", "date", "month", "amount", "category", "description", "card"]
+CATEGORICAL_COLUMNS = ["type", "month", "category", "card"]
+
+
+# -----------------------------
+# Lean DataFrames
+# -----------------------------
+# Views ask only for the columns they show. type, month, category and card
+# become categoricals whose categories come from the lookup tables and the
+# rollup months, so every chunk (and every cached frame) shares one dtype and
+# filters/groupbys run on small integer codes; dates become datetime64 and
+# ids the smallest integer type that holds them. Types come from the rollups
+# too, since legacy rows and generic CSV imports can hold values outside
+# TRANSACTION_TYPES, which a fixed list would silently turn into NaN.
+def _category_dtypes(conn):
+    import pandas as pd
+
+    stored = [r[0] for r in conn.execute("SELECT DISTINCT type FROM rollups ORDER BY type")]
+    names = {
+        "type": TRANSACTION_TYPES + [t for t in stored if t not in TRANSACTION_TYPES],
+        "month": [r[0] for r in conn.execute("SELECT DISTINCT month FROM rollups ORDER BY month")],
+        "category": [""] + [r[0] for r in conn.execute("SELECT name FROM categories ORDER BY name")],
+        "card": [""] + [r[0] for r in conn.execute("SELECT name FROM cards ORDER BY name")],
+    }
+    return {column: pd.CategoricalDtype(values) for column, values in names.items()}
+
+
+def _lean(frame, dtypes):
+    import pandas as pd
+
+    for column in frame.columns:
+        if column in dtypes:
+            frame[column] = frame[column].astype(dtypes[column])
+        elif column == "date":
+            frame[column] = pd.to_datetime(frame[column], format="%Y-%m-%d")
+        elif column == "id":
+            frame[column] = pd.to_numeric(frame[column], downcast="integer")
+    return frame
+
+
+def select_columns(columns=None):
+    columns = FRAME_COLUMNS if columns is None else [c for c in FRAME_COLUMNS if c in columns]
+    if not columns:
+        raise ValueError("No known transaction columns requested.")
+    return ", ".join(columns)
+
+
+def iter_frames(sql, params=(), chunksize=None, db_file=DB_FILE):
+    # Yields one typed frame per chunk (a single frame when chunksize is None).
+    # The lookups and the rows are read in one snapshot, so every value has a
+    # category.
+    import pandas as pd
+
+    with connection(db_file) as conn:
+        conn.execute("BEGIN")
+        dtypes = _category_dtypes(conn)
+        if chunksize is None:
+            yield _lean(pd.read_sql(sql, conn, params=params), dtypes)
+            return
+        for chunk in pd.read_sql(sql, conn, params=params, chunksize=chunksize):
+            yield _lean(chunk, dtypes)
+
+
+def load_frame(sql, params=(), chunksize=None, db_file=DB_FILE):
+    # Chunked reads bound the size of the intermediate object-dtype frames;
+    # the shared categoricals keep the concatenated result categorical.
+    import pandas as pd
+
+    frames = list(iter_frames(sql, params, chunksize, db_file))
+    if not frames:
+        # Chunked reads of an empty result yield nothing to take columns from
+        return next(iter_frames(sql, params, None, db_file))
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
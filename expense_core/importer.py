@@ -0,0 +1,281 @@
+import csv
+import datetime
+import hashlib
+import io
+import itertools
+import os
+import re
+import time
+from .db import DB_FILE
+from .schema import PARTITIONS, insert_transactions, to_cents
+from .writer import write
+
+CHUNK_SIZE = 5000
+DEFAULT_EXPENSE_CATEGORY = "🧾 Miscellaneous"
+
+# Column layouts of the statement exports we load. "amount" columns are
+# signed (negative = money out); "debit"/"credit" columns are both positive.
+PRESETS = {
+    # The app's own "Download CSV File" export
+    "generic": {
+        "header": True,
+        "date": "date", "date_formats": ["%Y-%m-%d"],
+        "amount": "amount", "signed": False,
+        "type": "type", "category": "category",
+        "description": ["description"], "card": "card",
+    },
+    "rbc": {
+        "header": True,
+        "date": "Transaction Date", "date_formats": ["%m/%d/%Y"],
+        "amount": "CAD$", "signed": True,
+        "description": ["Description 1", "Description 2"],
+    },
+    "cibc": {
+        "header": False,
+        "date": 0, "date_formats": ["%Y-%m-%d"],
+        "debit": 2, "credit": 3,
+        "description": [1],
+    },
+    "scotia": {
+        "header": True,
+        "date": "Date", "date_formats": ["%Y-%m-%d", "%m/%d/%Y"],
+        "amount": "Amount", "signed": True,
+        "description": ["Description", "Sub-description"],
+    },
+}
+
+
+# -----------------------------
+# Import Schema
+# -----------------------------
+# Imported rows carry a content hash in transactions.import_hash; the unique
+# index makes re-importing an overlapping statement a no-op for rows already
+# in the ledger. Rows without a matching hash are caught by content (see
+# existing_counts below).
+def create_import_schema(conn):
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_import_hash
+        ON transactions (import_hash)
+    ''')
+
+
+# -----------------------------
+# Statement Readers
+# -----------------------------
+def _open_text(source):
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, newline="", encoding="utf-8-sig")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, newline="", encoding="utf-8-sig")
+
+
+def _field(row, column):
+    if isinstance(column, int):
+        return row[column] if column < len(row) else ""
+    return row.get(column) or ""
+
+
+def _parse_date(value, formats):
+    value = value.strip()
+    for fmt in formats:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value!r}")
+
+
+def _parse_amount(value):
+    value = value.strip().replace(",", "").replace("$", "")
+    if not value:
+        return 0.0
+    if value.startswith("(") and value.endswith(")"):
+        return -float(value[1:-1])
+    return float(value)
+
+
+def read_csv(stream, preset):
+    layout = PRESETS[preset]
+    reader = csv.DictReader(stream) if layout["header"] else csv.reader(stream)
+    for row in reader:
+        if not any(row.values() if isinstance(row, dict) else row):
+            continue
+        if "debit" in layout:
+            amount = _parse_amount(_field(row, layout["credit"])) - _parse_amount(_field(row, layout["debit"]))
+        elif layout["signed"]:
+            amount = _parse_amount(_field(row, layout["amount"]))
+        else:
+            amount = None
+        record = {
+            "date": _parse_date(_field(row, layout["date"]), layout["date_formats"]),
+            "signed_amount": amount,
+            "description": " ".join(
+                _field(row, col).strip() for col in layout["description"] if _field(row, col).strip()
+            ),
+            "ref": "",
+        }
+        if amount is None:
+            record["amount"] = _parse_amount(_field(row, layout["amount"]))
+            record["type"] = _field(row, layout["type"])
+            record["category"] = _field(row, layout["category"])
+            record["card"] = _field(row, layout["card"])
+        yield record
+
+
+_OFX_TAG = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def read_ofx(stream):
+    # OFX/QFX files are SGML; only the <STMTTRN> blocks are parsed, line by
+    # line, so the whole file is never held in memory.
+    fields = None
+    for line in stream:
+        upper = line.upper()
+        if "<STMTTRN>" in upper:
+            fields = {}
+        if fields is not None:
+            for tag, value in _OFX_TAG.findall(line):
+                fields[tag.upper()] = value.strip()
+        if "</STMTTRN>" in upper and fields is not None:
+            yield {
+                "date": datetime.datetime.strptime(fields["DTPOSTED"][:8], "%Y%m%d").date(),
+                "signed_amount": _parse_amount(fields.get("TRNAMT", "0")),
+                "description": " ".join(filter(None, [fields.get("NAME", ""), fields.get("MEMO", "")])),
+                "ref": fields.get("FITID", ""),
+            }
+            fields = None
+
+
+# -----------------------------
+# Mapping & Dedup
+# -----------------------------
+def categorize(description, rules):
+    lowered = description.lower()
+    for keyword, category in (rules or {}).items():
+        if keyword.lower() in lowered:
+            return category
+    return DEFAULT_EXPENSE_CATEGORY
+
+
+def to_transaction(record, card="", category_rules=None):
+    if record["signed_amount"] is None:
+        trx_type = record["type"]
+        amount = record["amount"]
+        category = record["category"]
+        trx_card = record["card"]
+    else:
+        # Money out is spending; money in is a card payment on a credit card
+        # statement and income on a bank account statement.
+        signed = record["signed_amount"]
+        amount = abs(signed)
+        trx_card = card
+        if signed < 0:
+            trx_type, category = "Expense", categorize(record["description"], category_rules)
+        elif card:
+            trx_type, category = "Repayment", "Repayment"
+        else:
+            trx_type, category = "Income", "Income"
+    return {
+        "type": trx_type,
+        "date": record["date"].isoformat(),
+        "amount": amount,
+        "category": category,
+        "description": record["description"],
+        "card": trx_card,
+    }
+
+
+def content_hash(trx, ref, occurrence):
+    # Identical purchases on the same day are kept apart by their position
+    # among identical rows in the file, so re-imports still match exactly.
+    key = "\x1f".join(str(v) for v in (
+        trx["type"], trx["date"], f"{trx['amount']:.2f}", trx["description"], trx["card"], ref, occurrence,
+    ))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+# Rows entered by hand, by the edit grid or by another statement format have
+# no matching hash, so statement rows are also matched on content against
+# the ledger as it stood before the import: the nth row of the file with the
+# same type, date, amount, description and card is skipped when the ledger
+# already held n of them. Counts are read once per chunk, over the chunk's
+# date range in both partitions.
+EXISTING_SQL = '''
+    SELECT t.type, t.date, t.amount_cents, COALESCE(t.description, ''), COALESCE(k.name, ''), COUNT(*)
+    FROM {table} t
+    LEFT JOIN cards k ON k.id = t.card_id
+    WHERE t.date BETWEEN ? AND ?
+    GROUP BY 1, 2, 3, 4, 5
+'''
+
+
+def existing_counts(conn, first_date, last_date):
+    counts = {}
+    for table in PARTITIONS:
+        for *identity, count in conn.execute(EXISTING_SQL.format(table=table), (first_date, last_date)):
+            counts[tuple(identity)] = counts.get(tuple(identity), 0) + count
+    return counts
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def detect_format(name):
+    return "ofx" if str(name).lower().endswith((".ofx", ".qfx")) else "csv"
+
+
+def import_statement(source, fmt=None, preset="generic", card="", category_rules=None,
+                     chunk_size=CHUNK_SIZE, db_file=DB_FILE):
+    fmt = fmt or detect_format(getattr(source, "name", source))
+    started = time.perf_counter()
+    seen = {}
+    existing = {}   # content identity -> rows the ledger held before the import
+    matched = {}
+
+    def insert_chunks(conn, records):
+        read = inserted = 0
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            read += len(chunk)
+            trxs = [to_transaction(record, card, category_rules) for record in chunk]
+            contents = [(t["type"], t["date"], to_cents(t["amount"]), t["description"], t["card"]) for t in trxs]
+            new = {content for content in contents if content not in existing}
+            if new:
+                counts = existing_counts(conn, min(c[1] for c in new), max(c[1] for c in new))
+                existing.update((content, counts.get(content, 0)) for content in new)
+            rows = []
+            for record, trx, content in zip(chunk, trxs, contents):
+                identity = (trx["type"], trx["date"], trx["amount"], trx["description"], trx["card"], record["ref"])
+                seen[identity] = occurrence = seen.get(identity, 0) + 1
+                matched[content] = matched.get(content, 0) + 1
+                if matched[content] <= existing[content]:
+                    continue
+                rows.append((
+                    trx["type"], trx["date"], trx["amount"], trx["category"],
+                    trx["description"], trx["card"], content_hash(trx, record["ref"], occurrence),
+                ))
+            # The count excludes trigger writes and rows ignored as duplicates
+            inserted += insert_transactions(conn, rows)
+        return read, inserted
+
+    stream = _open_text(source)
+    try:
+        records = read_ofx(stream) if fmt == "ofx" else read_csv(stream, preset)
+        # The whole statement is one queued write, so it commits atomically
+        # alongside (not in between) other sessions' writes.
+        read, inserted = write(db_file, insert_chunks, records)
+    finally:
+        if stream is not source:
+            stream.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "read": read,
+        "inserted": inserted,
+        "duplicates": read - inserted,
+        "seconds": seconds,
+        "rows_per_second": read / seconds if seconds else 0.0,
+    }
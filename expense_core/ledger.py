@@ -0,0 +1,306 @@
+from .db import DB_FILE, connection, transaction, create_version_triggers, data_version, data_versions
+from .cache import query_cache
+from .schema import (
+    PARTITIONS, create_transactions_schema, insert_transactions, update_transactions, delete_transactions, to_cents,
+    month_range,
+)
+from .archive import source_view
+from .frames import load_frame, select_columns
+from .search import create_search_index
+from .importer import create_import_schema
+from .rollups import create_rollups, card_totals
+from .recurring import create_recurring_schema
+from .alerts import create_alerts
+from .writer import write, write_exclusive
+from .backup import take_snapshot
+
+# pandas is imported inside the DataFrame readers only, so scripts that just
+# write or read rollups never pay for it. Every write goes through the
+# per-database write queue and returns once it has committed.
+
+DEFAULT_CARDS = ["RBC", "Rogers", "CIBC", "CIBC Costco", "Walmart", "Triangle", "Scotia"]
+
+DEFAULT_CATEGORIES = [
+    "🧒 Day Care", "🎓 Education", "🎮 Entertainment", "🍽️ Food", "🛒 Grocery",
+    "🛡️ Insurance", "📈 Investments", "🏥 Medical", "🧾 Miscellaneous",
+    "🏠 Rent", "🛍️ Shopping", "🚌 Transportation", "💡 Utilities"
+]
+
+
+# -----------------------------
+# Database Setup
+# -----------------------------
+def create_tables(db_file=DB_FILE):
+    with transaction(db_file) as conn:
+        c = conn.cursor()
+        migrated = create_transactions_schema(conn)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS savings (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                amount REAL
+            )
+        ''')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS card_limits (
+                card TEXT PRIMARY KEY,
+                max_limit REAL
+            )
+        ''')
+        c.execute('INSERT OR IGNORE INTO savings (id, amount) VALUES (1, 0)')
+        for card in DEFAULT_CARDS:
+            c.execute('INSERT OR IGNORE INTO card_limits (card, max_limit) VALUES (?, ?)', (card, 0))
+        # IF NOT EXISTS also migrates databases created before these indexes
+        c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date, id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category_id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_card_type ON transactions (card_id, type)')
+        create_import_schema(conn)
+        create_recurring_schema(conn)
+        create_rollups(conn)
+        create_alerts(conn)
+        # After every versioned table exists
+        create_version_triggers(conn)
+        create_search_index(conn)
+    if migrated:
+        # Reclaim the space freed by the compact schema
+        with connection(db_file) as conn:
+            conn.execute("VACUUM")
+
+
+# -----------------------------
+# Transactions
+# -----------------------------
+def _execute(conn, sql, params=()):
+    return conn.execute(sql, params).rowcount
+
+
+def add_transaction(trx, db_file=DB_FILE):
+    return write(db_file, insert_transactions, [
+        (trx["type"], trx["date"], trx["amount"], trx["category"], trx["description"], trx["card"], None)
+    ])
+
+
+def _read_sql(sql, params=(), db_file=DB_FILE):
+    import pandas as pd
+
+    with connection(db_file) as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+
+# The transaction readers below return lean frames (see frames.py): pass
+# columns to load only what a view shows, and chunksize to bound peak memory
+# while reading large ranges.
+def get_transactions(db_file=DB_FILE, columns=None, chunksize=None):
+    # Served from memory until a write bumps the transactions version
+    return query_cache.get_or_load(
+        (db_file, f"transactions:{select_columns(columns)}"), data_version("transactions", db_file),
+        lambda: load_frame(f"SELECT {select_columns(columns)} FROM transactions_view ORDER BY date DESC",
+                           chunksize=chunksize, db_file=db_file),
+    )
+
+
+def _query_transactions(where, params, db_file=DB_FILE, start_date=None, columns=None, chunksize=None):
+    # start_date is the earliest date the filter can match; ranges reaching
+    # into archived months read both partitions
+    with connection(db_file) as conn:
+        view = source_view(conn, start_date)
+    return load_frame(
+        f"SELECT {select_columns(columns)} FROM {view} WHERE {where} ORDER BY date DESC, id DESC",
+        params, chunksize, db_file,
+    )
+
+
+def get_transactions_by_month(month, db_file=DB_FILE, columns=None):
+    start, end = month_range(month)
+    return query_cache.get_or_load(
+        (db_file, f"month:{month}:{select_columns(columns)}"), data_version("transactions", db_file),
+        lambda: _query_transactions("date BETWEEN ? AND ?", (start, end), db_file, start, columns),
+    )
+
+
+def get_transactions_by_date(date, db_file=DB_FILE, columns=None):
+    return query_cache.get_or_load(
+        (db_file, f"date:{date}:{select_columns(columns)}"), data_version("transactions", db_file),
+        lambda: _query_transactions("date = ?", (str(date),), db_file, date, columns),
+    )
+
+
+def get_transactions_between(start, end, db_file=DB_FILE, columns=None, chunksize=None):
+    return query_cache.get_or_load(
+        (db_file, f"range:{start}:{end}:{select_columns(columns)}"), data_version("transactions", db_file),
+        lambda: _query_transactions("date BETWEEN ? AND ?", (str(start), str(end)), db_file, start,
+                                    columns, chunksize),
+    )
+
+
+def has_transactions(db_file=DB_FILE):
+    with connection(db_file) as conn:
+        return any(conn.execute(f"SELECT EXISTS (SELECT 1 FROM {table})").fetchone()[0] for table in PARTITIONS)
+
+
+def get_categories(db_file=DB_FILE, include_archive=True):
+    # Categories in use; pass include_archive=False to match a hot-only reader
+    tables = PARTITIONS if include_archive else PARTITIONS[:1]
+    used = " UNION ".join(f"SELECT category_id FROM {table}" for table in tables)
+    with connection(db_file) as conn:
+        rows = conn.execute(f"SELECT name FROM categories WHERE id IN ({used}) ORDER BY name")
+        return [r[0] for r in rows]
+
+
+def delete_transaction(trx_id, db_file=DB_FILE):
+    return write(db_file, delete_transactions, [trx_id])
+
+
+def _update_transaction(conn, trx_id, amount, description):
+    # The row is in exactly one partition
+    return sum(
+        _execute(conn, f'UPDATE {table} SET amount_cents = ?, description = ? WHERE id = ?',
+                 (to_cents(amount), description, int(trx_id)))
+        for table in PARTITIONS
+    )
+
+
+def update_transaction(trx_id, amount, description, db_file=DB_FILE):
+    return write(db_file, _update_transaction, trx_id, amount, description)
+
+
+# A reset first snapshots the database, then empties the ledger in bulk.
+# It is an exclusive queued write, so every write queued before it has
+# committed, and the snapshot is read by another connection while its own
+# transaction holds the write lock: nothing can land between the two. The
+# per-row triggers on the partitions are dropped for the DELETEs, which lets
+# SQLite truncate the tables. What they maintain (rollups, and through them the
+# card balances and alerts, the search index and the data version) is then
+# cleared directly. The data versions the reset leaves behind are returned
+# with the snapshot, so undo_reset() can refuse once anything else is written.
+def _reset_transactions(db_file):
+    with transaction(db_file) as conn:
+        snapshot = take_snapshot(db_file, "reset", pages=-1)
+        placeholders = ", ".join("?" * len(PARTITIONS))
+        triggers = conn.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({placeholders})", PARTITIONS
+        ).fetchall()
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER "{name}"')
+        for table in PARTITIONS:
+            conn.execute(f'DELETE FROM {table}')
+        for _, sql in triggers:
+            conn.execute(sql)
+        conn.execute("DELETE FROM rollups")
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('delete-all')")
+        conn.execute("UPDATE data_versions SET version = version + 1 WHERE name = 'transactions'")
+        conn.execute('UPDATE savings SET amount = 0 WHERE id = 1')
+        return {"snapshot": snapshot, "versions": data_versions(conn)}
+
+
+def reset_transactions(db_file=DB_FILE):
+    # Returns {"snapshot", "versions"}, the arguments undo_reset() takes
+    return write_exclusive(db_file, _reset_transactions, db_file)
+
+
+# -----------------------------
+# Batch Editing
+# -----------------------------
+# The edit grid hands back the whole edited frame; only the differences
+# against the rows it was loaded with are written, in one queued write.
+EDITABLE_COLUMNS = ["type", "date", "amount", "category", "description", "card"]
+
+
+def _edited_values(row):
+    values = {}
+    for column in EDITABLE_COLUMNS:
+        value = getattr(row, column)
+        values[column] = "" if value is None or value != value else value   # NaN != NaN
+    values["date"] = str(values["date"])[:10]
+    return values
+
+
+def diff_transactions(original, edited):
+    # Returns (inserts, updates, deletes) shaped for insert_transactions,
+    # update_transactions and delete_transactions.
+    before = {int(row.id): _edited_values(row) for row in original.itertuples(index=False)}
+    inserts, updates, kept = [], [], set()
+    for number, row in enumerate(edited.itertuples(index=False), start=1):
+        values = _edited_values(row)
+        if not (values["type"] and values["date"] and values["amount"] != ""):
+            raise ValueError(f"Row {number} needs a type, date and amount.")
+        if row.id is None or row.id != row.id:
+            inserts.append(tuple(values[c] for c in EDITABLE_COLUMNS) + (None,))
+            continue
+        trx_id = int(row.id)
+        kept.add(trx_id)
+        old = before.get(trx_id)
+        changed = old is None or any(
+            to_cents(values[c]) != to_cents(old[c]) if c == "amount" else values[c] != old[c]
+            for c in EDITABLE_COLUMNS
+        )
+        if changed:
+            updates.append((trx_id, values["type"], values["date"], values["amount"],
+                            values["category"], values["description"], values["card"]))
+    deletes = [trx_id for trx_id in before if trx_id not in kept]
+    return inserts, updates, deletes
+
+
+def _apply_transaction_changes(conn, inserts, updates, deletes):
+    return {
+        "inserted": insert_transactions(conn, inserts) if inserts else 0,
+        "updated": update_transactions(conn, updates) if updates else 0,
+        "deleted": delete_transactions(conn, deletes) if deletes else 0,
+    }
+
+
+def apply_transaction_changes(inserts=(), updates=(), deletes=(), db_file=DB_FILE):
+    return write(db_file, _apply_transaction_changes, list(inserts), list(updates), list(deletes))
+
+
+# -----------------------------
+# Savings
+# -----------------------------
+def update_savings(amount, db_file=DB_FILE):
+    write(db_file, _execute, 'UPDATE savings SET amount = amount + ?', (amount,))
+
+
+def set_savings(amount, db_file=DB_FILE):
+    write(db_file, _execute, 'UPDATE savings SET amount = ?', (amount,))
+
+
+def get_savings(db_file=DB_FILE):
+    with connection(db_file) as conn:
+        return conn.execute('SELECT amount FROM savings WHERE id=1').fetchone()[0]
+
+
+# -----------------------------
+# Credit Cards
+# -----------------------------
+def get_card_limits(db_file=DB_FILE):
+    return query_cache.get_or_load(
+        (db_file, "card_limits"), data_version("card_limits", db_file),
+        lambda: _read_sql("SELECT * FROM card_limits", db_file=db_file),
+    )
+
+
+def _load_card_summary(db_file):
+    import pandas as pd
+
+    summary = pd.DataFrame(card_totals(db_file), columns=["card", "max_limit", "spent", "repaid"])
+    summary["outstanding"] = summary["spent"] - summary["repaid"]
+    summary["available"] = summary["max_limit"] - summary["outstanding"]
+    summary["utilization"] = (summary["outstanding"] / summary["max_limit"].where(summary["max_limit"] > 0)).clip(0, 1)
+    return summary
+
+
+def get_card_summary(db_file=DB_FILE):
+    # Card limits and card spend change independently, so key on both versions
+    version = (data_version("card_limits", db_file), data_version("transactions", db_file))
+    return query_cache.get_or_load((db_file, "card_summary"), version, lambda: _load_card_summary(db_file))
+
+
+def update_card_limit(card, limit, db_file=DB_FILE):
+    write(db_file, _execute, 'UPDATE card_limits SET max_limit = ? WHERE card = ?', (limit, card))
+
+
+def add_card(card, db_file=DB_FILE):
+    write(db_file, _execute, "INSERT OR IGNORE INTO card_limits (card, max_limit) VALUES (?, ?)", (card, 0))
+
+
+def remove_card(card, db_file=DB_FILE):
+    write(db_file, _execute, "DELETE FROM card_limits WHERE card = ?", (card,))
@@ -0,0 +1,46 @@
+from .db import DB_FILE, connection
+from .archive import source_view
+
+PAGE_SIZES = [25, 50, 100, 250]
+FILTER_COLUMNS = ["type", "category", "card"]
+
+# pandas is imported inside fetch_page only, like the other readers.
+
+
+# -----------------------------
+# Keyset Pagination
+# -----------------------------
+# Pages are addressed by the (date, id) of the last row already shown, so
+# every page is an index range scan on idx_transactions_date no matter how
+# deep into the history it is, unlike LIMIT/OFFSET. Archived months are
+# only read when a start_date reaches them or filters["archived"] is set.
+def fetch_page(after=None, page_size=50, descending=True, filters=None, db_file=DB_FILE):
+    import pandas as pd
+
+    clauses, params = [], []
+    for column, value in (filters or {}).items():
+        if column in FILTER_COLUMNS and value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        elif column == "start_date" and value is not None:
+            clauses.append("date >= ?")
+            params.append(str(value))
+        elif column == "end_date" and value is not None:
+            clauses.append("date <= ?")
+            params.append(str(value))
+    if after is not None:
+        clauses.append(f"(date, id) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+
+    order = "DESC" if descending else "ASC"
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with connection(db_file) as conn:
+        view = source_view(conn, (filters or {}).get("start_date"), (filters or {}).get("archived", False))
+        sql = f"SELECT * FROM {view} {where} ORDER BY date {order}, id {order} LIMIT ?"
+        page = pd.read_sql(sql, conn, params=params + [page_size + 1])
+
+    # One extra row is read only to learn whether a next page exists
+    has_next = len(page) > page_size
+    page = page.iloc[:page_size]
+    next_cursor = (page["date"].iloc[-1], int(page["id"].iloc[-1])) if has_next else None
+    return page, next_cursor
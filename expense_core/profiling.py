@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+PROFILE_ENV = "EXPENSE_PROFILE"
+PROFILE_LOG = "profile.log"
+
+
+# -----------------------------
+# Profiler
+# -----------------------------
+# Opt-in, process-wide timings of dashboard sections and SQL statements.
+# Statements are keyed on their whitespace-normalized text; each entry keeps
+# a call count, total and max time, and rows fetched. When disabled the only
+# cost is one flag check per cursor.
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sections = {}
+            self.queries = {}
+            self.started = time.time()
+
+    def _record(self, table, key, seconds, rows=0, calls=1):
+        with self._lock:
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+            ms = seconds * 1000
+            entry["count"] += calls
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["rows"] += rows
+
+    def record_query(self, sql, seconds, rows=0, calls=1):
+        self._record(self.queries, normalize_sql(sql), seconds, rows, calls)
+
+    def record_section(self, name, seconds):
+        if self.enabled:
+            self._record(self.sections, name, seconds)
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_section(name, time.perf_counter() - started)
+
+    def timed(self, name=None):
+        # Decorator form of section(); goes under @st.fragment so fragment
+        # reruns are timed too. The label defaults to the function name.
+        def decorator(func):
+            label = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.section(label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "since": self.started,
+                "sections": {k: dict(v) for k, v in self.sections.items()},
+                "queries": {k: dict(v) for k, v in self.queries.items()},
+            }
+
+    def dump(self, path=PROFILE_LOG):
+        # Appends one JSON line per dump so successive snapshots can be diffed
+        record = {"time": time.time(), **self.snapshot()}
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return path
+
+
+def normalize_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+profiler = Profiler(enabled=os.environ.get(PROFILE_ENV, "") not in ("", "0"))
+
+
+# -----------------------------
+# Instrumented Connection
+# -----------------------------
+# Pooled connections are created with this factory. Cursors are only swapped
+# for the timing subclass while the profiler is enabled.
+class ProfiledCursor(sqlite3.Cursor):
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        self._sql = sql
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            profiler.record_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # Rows written, since executemany statements return none
+            profiler.record_query(sql, time.perf_counter() - started, max(self.rowcount, 0))
+
+    def _fetched(self, started, rows):
+        # Fetch time and rows are added to the statement's entry without
+        # counting another call.
+        if self._sql is not None:
+            profiler.record_query(self._sql, time.perf_counter() - started, rows, calls=0)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, int(row is not None))
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(started, 1)
+        return row
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = ProfiledCursor if profiler.enabled else sqlite3.Cursor
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,166 @@
+import calendar
+import datetime
+from .db import DB_FILE, connection
+from .schema import insert_transactions, to_cents
+from .writer import write
+
+FREQUENCIES = ["weekly", "biweekly", "monthly", "quarterly", "yearly"]
+_STEP_DAYS = {"weekly": 7, "biweekly": 14}
+_STEP_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+
+# -----------------------------
+# Recurring Schema
+# -----------------------------
+# A schedule describes one repeating transaction (a salary, the CCB, rent,
+# day care, a card autopay). next_date is the first occurrence not yet
+# written to the ledger. Generated rows carry "recurring:<id>:<date>" in
+# transactions.import_hash, so the unique import index turns any re-run
+# over the same dates into a no-op.
+def create_recurring_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS recurring_schedules (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            category TEXT,
+            description TEXT,
+            card TEXT,
+            frequency TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            next_date TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+
+
+def occurrence_key(schedule_id, date):
+    return f"recurring:{schedule_id}:{date}"
+
+
+# -----------------------------
+# Occurrences
+# -----------------------------
+def _add_months(date, months):
+    # Clamped to the month's last day, so a schedule anchored on the 31st
+    # lands on Feb 28/29 without drifting for the rest of the year.
+    month = date.month - 1 + months
+    year = date.year + month // 12
+    month = month % 12 + 1
+    return datetime.date(year, month, min(date.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(frequency, start_date, after, until, end_date=None):
+    # Dates of the schedule in [after, until], always counted from
+    # start_date so month-end clamping never accumulates.
+    start = datetime.date.fromisoformat(str(start_date))
+    after = datetime.date.fromisoformat(str(after))
+    until = datetime.date.fromisoformat(str(until))
+    if end_date:
+        until = min(until, datetime.date.fromisoformat(str(end_date)))
+    if frequency in _STEP_DAYS:
+        step = _STEP_DAYS[frequency]
+        n = max(0, -(-(after - start).days // step))
+        date = start + datetime.timedelta(days=n * step)
+        while date <= until:
+            yield date
+            n += 1
+            date = start + datetime.timedelta(days=n * step)
+    elif frequency in _STEP_MONTHS:
+        step = _STEP_MONTHS[frequency]
+        n = max(0, ((after.year - start.year) * 12 + after.month - start.month) // step - 1)
+        date = _add_months(start, n * step)
+        while date <= until:
+            if date >= after:
+                yield date
+            n += 1
+            date = _add_months(start, n * step)
+    else:
+        raise ValueError(f"Unknown frequency: {frequency!r}")
+
+
+# -----------------------------
+# Materialization
+# -----------------------------
+def _materialize(conn, until, schedule_ids=None):
+    sql = ("SELECT id, type, amount_cents, category, description, card, frequency, start_date, end_date, next_date "
+           "FROM recurring_schedules WHERE active = 1 AND next_date <= ?")
+    params = [str(until)]
+    if schedule_ids is not None:
+        sql += f" AND id IN ({', '.join('?' * len(schedule_ids))})"
+        params += list(schedule_ids)
+
+    rows, advanced = [], []
+    for (schedule_id, trx_type, cents, category, description, card,
+         frequency, start_date, end_date, next_date) in conn.execute(sql, params).fetchall():
+        last = None
+        for date in occurrences(frequency, start_date, next_date, until, end_date):
+            rows.append((trx_type, date, cents / 100, category or "", description or "", card or "",
+                         occurrence_key(schedule_id, date)))
+            last = date
+        following = next(occurrences(frequency, start_date, (last or until) + datetime.timedelta(days=1),
+                                     datetime.date.max, end_date), None)
+        # A finished schedule parks past any date it could be asked about
+        advanced.append((following.isoformat() if following else "9999-12-31", schedule_id))
+
+    inserted = insert_transactions(conn, rows) if rows else 0
+    conn.executemany("UPDATE recurring_schedules SET next_date = ? WHERE id = ?", advanced)
+    return {"due": len(rows), "inserted": inserted, "duplicates": len(rows) - inserted}
+
+
+def materialize(until=None, schedule_ids=None, db_file=DB_FILE):
+    # Writes every occurrence due up to until (today by default) in one
+    # executemany, then moves each schedule's next_date past it.
+    until = until or datetime.date.today()
+    return write(db_file, _materialize, until, schedule_ids)
+
+
+# -----------------------------
+# Schedules
+# -----------------------------
+def _add_schedule(conn, name, trx_type, amount, category, description, card, frequency, start_date, end_date):
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency!r}")
+    return conn.execute('''
+        INSERT INTO recurring_schedules
+            (name, type, amount_cents, category, description, card, frequency, start_date, end_date, next_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (name, trx_type, to_cents(amount), category, description, card, frequency,
+          str(start_date), str(end_date) if end_date else None, str(start_date))).lastrowid
+
+
+def add_schedule(name, trx_type, amount, category="", description="", card="", frequency="monthly",
+                 start_date=None, end_date=None, db_file=DB_FILE):
+    start_date = start_date or datetime.date.today()
+    return write(db_file, _add_schedule, name, trx_type, amount, category, description, card,
+                 frequency, start_date, end_date)
+
+
+def _set_active(conn, schedule_id, active):
+    return conn.execute("UPDATE recurring_schedules SET active = ? WHERE id = ?", (int(active), schedule_id)).rowcount
+
+
+def set_schedule_active(schedule_id, active, db_file=DB_FILE):
+    return write(db_file, _set_active, schedule_id, active)
+
+
+def _remove_schedule(conn, schedule_id):
+    # Transactions already generated stay in the ledger
+    return conn.execute("DELETE FROM recurring_schedules WHERE id = ?", (schedule_id,)).rowcount
+
+
+def remove_schedule(schedule_id, db_file=DB_FILE):
+    return write(db_file, _remove_schedule, schedule_id)
+
+
+def get_schedules(db_file=DB_FILE):
+    with connection(db_file) as conn:
+        cursor = conn.execute('''
+            SELECT id, name, type, amount_cents / 100.0 AS amount, category, description, card,
+                   frequency, start_date, end_date, next_date, active
+            FROM recurring_schedules ORDER BY next_date, name
+        ''')
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
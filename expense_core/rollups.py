@@ -0,0 +1,167 @@
+from .db import DB_FILE, connection, transaction
+from .schema import PARTITIONS
+
+ROLLUP_KEYS = {
+    "month": "substr({row}.date, 1, 7)",
+    "type": "{row}.type",
+    "category_id": "COALESCE({row}.category_id, 0)",
+    "card_id": "COALESCE({row}.card_id, 0)",
+}
+
+
+# -----------------------------
+# Rollup Schema
+# -----------------------------
+# Per month x type x category x card sums (in cents) and counts, kept
+# current by triggers on both ledger partitions so dashboard totals never
+# rescan the ledger. Missing categories/cards are keyed as id 0.
+def create_rollups(conn):
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(rollups)")]
+    if columns and "total_cents" not in columns:
+        # Pre-compact rollups keyed on names and REAL totals
+        conn.execute("DROP TABLE rollups")
+        columns = []
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rollups (
+            month TEXT NOT NULL, type TEXT NOT NULL,
+            category_id INTEGER NOT NULL, card_id INTEGER NOT NULL,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, type, category_id, card_id)
+        )
+    ''')
+    # Both partitions feed the same rollups, so archiving a month (a delete
+    # from one table and an insert into the other) leaves totals unchanged.
+    for table in PARTITIONS:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_insert_rollup
+            AFTER INSERT ON {table}
+            BEGIN
+                {_add("NEW")}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_delete_rollup
+            AFTER DELETE ON {table}
+            BEGIN
+                {_subtract("OLD")}
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_update_rollup
+            AFTER UPDATE OF type, date, amount_cents, category_id, card_id ON {table}
+            BEGIN
+                {_subtract("OLD")}
+                {_add("NEW")}
+            END
+        ''')
+    if not columns:
+        _rebuild(conn)
+
+
+def _key_values(row):
+    return ", ".join(expr.format(row=row) for expr in ROLLUP_KEYS.values())
+
+
+def _key_match(row):
+    return " AND ".join(f"{key} = {expr.format(row=row)}" for key, expr in ROLLUP_KEYS.items())
+
+
+def _add(row):
+    return f'''
+            INSERT INTO rollups (month, type, category_id, card_id, total_cents, count)
+            VALUES ({_key_values(row)}, {row}.amount_cents, 1)
+            ON CONFLICT (month, type, category_id, card_id) DO UPDATE
+            SET total_cents = total_cents + excluded.total_cents, count = count + 1;'''
+
+
+def _subtract(row):
+    return f'''
+            UPDATE rollups SET total_cents = total_cents - {row}.amount_cents, count = count - 1
+            WHERE {_key_match(row)};
+            DELETE FROM rollups WHERE count <= 0 AND {_key_match(row)};'''
+
+
+_AGGREGATE_SQL = f'''
+    SELECT {_key_values("t")}, SUM(t.amount_cents) AS total_cents, COUNT(*) AS count
+    FROM ({" UNION ALL ".join(f"SELECT * FROM {table}" for table in PARTITIONS)}) t
+    GROUP BY 1, 2, 3, 4
+'''
+
+
+def _rebuild(conn):
+    conn.execute("DELETE FROM rollups")
+    conn.execute(f"INSERT INTO rollups (month, type, category_id, card_id, total_cents, count) {_AGGREGATE_SQL}")
+
+
+# -----------------------------
+# Rebuild & Verify
+# -----------------------------
+def rebuild_rollups(db_file=DB_FILE):
+    with transaction(db_file) as conn:
+        _rebuild(conn)
+        return conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+
+
+def verify_rollups(db_file=DB_FILE):
+    # Returns the rollup keys whose stored sums or counts differ from a full scan
+    with connection(db_file) as conn:
+        expected = {tuple(r[:4]): (r[4], r[5]) for r in conn.execute(_AGGREGATE_SQL)}
+        stored = {tuple(r[:4]): (r[4], r[5]) for r in conn.execute(
+            "SELECT month, type, category_id, card_id, total_cents, count FROM rollups"
+        )}
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        want = expected.get(key, (0, 0))
+        have = stored.get(key, (0, 0))
+        if want != have:
+            mismatches.append({"key": key, "expected": want, "stored": have})
+    return mismatches
+
+
+# -----------------------------
+# Rollup Queries
+# -----------------------------
+def totals_by_type(month=None, db_file=DB_FILE):
+    sql = "SELECT type, SUM(total_cents) / 100.0 FROM rollups"
+    params = ()
+    if month is not None:
+        sql += " WHERE month = ?"
+        params = (month,)
+    with connection(db_file) as conn:
+        return dict(conn.execute(sql + " GROUP BY type", params).fetchall())
+
+
+def totals_by_category(trx_type="Expense", month=None, db_file=DB_FILE):
+    sql = '''
+        SELECT COALESCE(c.name, '') AS category, SUM(r.total_cents) / 100.0
+        FROM rollups r LEFT JOIN categories c ON c.id = r.category_id
+        WHERE r.type = ?
+    '''
+    params = [trx_type]
+    if month is not None:
+        sql += " AND r.month = ?"
+        params.append(month)
+    sql += " GROUP BY r.category_id HAVING SUM(r.count) > 0 ORDER BY category"
+    with connection(db_file) as conn:
+        return dict(conn.execute(sql, params).fetchall())
+
+
+def card_totals(db_file=DB_FILE):
+    # One pass over the card x type rollups, joined with every configured card
+    with connection(db_file) as conn:
+        return conn.execute('''
+            SELECT cl.card, COALESCE(cl.max_limit, 0) AS max_limit,
+                   COALESCE(SUM(CASE WHEN r.type = 'Expense' THEN r.total_cents END), 0) / 100.0 AS spent,
+                   COALESCE(SUM(CASE WHEN r.type = 'Repayment' THEN r.total_cents END), 0) / 100.0 AS repaid
+            FROM card_limits cl
+            LEFT JOIN cards k ON k.name = cl.card
+            LEFT JOIN rollups r ON r.card_id = k.id AND r.type IN ('Expense', 'Repayment')
+            GROUP BY cl.card, cl.max_limit
+            ORDER BY cl.rowid
+        ''').fetchall()
+
+
+def available_months(db_file=DB_FILE):
+    with connection(db_file) as conn:
+        return [r[0] for r in conn.execute("SELECT DISTINCT month FROM rollups ORDER BY month")]
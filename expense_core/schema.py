@@ -0,0 +1,199 @@
+import calendar
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+# -----------------------------
+# Ledger Schema
+# -----------------------------
+# Amounts are stored as integer cents, dates as ISO "YYYY-MM-DD" text (the
+# month is derived from it) and categories/cards as ids into small lookup
+# tables. transactions_view decodes rows back to the familiar column names
+# for every reader.
+TRANSACTIONS_SQL = '''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        date TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL DEFAULT 0,
+        category_id INTEGER REFERENCES categories (id),
+        card_id INTEGER REFERENCES cards (id),
+        description TEXT,
+        import_hash TEXT
+    )
+'''
+
+_DECODE_SQL = '''
+    SELECT t.id, t.type, t.date, substr(t.date, 1, 7) AS month,
+           t.amount_cents / 100.0 AS amount,
+           COALESCE(c.name, '') AS category, t.description,
+           COALESCE(k.name, '') AS card
+    FROM {table} t
+    LEFT JOIN categories c ON c.id = t.category_id
+    LEFT JOIN cards k ON k.id = t.card_id
+'''
+
+VIEW_SQL = "CREATE VIEW IF NOT EXISTS transactions_view AS" + _DECODE_SQL.format(table="transactions")
+
+# Closed months are moved to transactions_archive (same columns, ids kept).
+# transactions_view is the hot partition the app reads by default;
+# transactions_all_view adds the archive for historical ranges.
+PARTITIONS = ["transactions", "transactions_archive"]
+
+ARCHIVE_SQL = '''
+    CREATE TABLE IF NOT EXISTS transactions_archive (
+        id INTEGER PRIMARY KEY,
+        type TEXT NOT NULL,
+        date TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL DEFAULT 0,
+        category_id INTEGER REFERENCES categories (id),
+        card_id INTEGER REFERENCES cards (id),
+        description TEXT,
+        import_hash TEXT UNIQUE
+    )
+'''
+
+ALL_VIEW_SQL = ("CREATE VIEW IF NOT EXISTS transactions_all_view AS"
+                + " UNION ALL ".join(_DECODE_SQL.format(table=table) for table in PARTITIONS))
+
+INSERT_SQL = '''
+    INSERT OR IGNORE INTO transactions
+        (type, date, amount_cents, category_id, card_id, description, import_hash)
+    VALUES (?, ?, ?,
+            (SELECT id FROM categories WHERE name = ?),
+            (SELECT id FROM cards WHERE name = ?),
+            ?, ?)
+'''
+
+UPDATE_SQL = '''
+    UPDATE {table}
+    SET type = ?, date = ?, amount_cents = ?,
+        category_id = (SELECT id FROM categories WHERE name = ?),
+        card_id = (SELECT id FROM cards WHERE name = ?),
+        description = ?
+    WHERE id = ?
+'''
+
+
+def create_transactions_schema(conn):
+    # Returns True when a pre-compact database was migrated, so the caller
+    # can VACUUM once the surrounding transaction has committed.
+    conn.execute("CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("CREATE TABLE IF NOT EXISTS cards (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(transactions)")]
+    migrated = bool(columns) and "amount_cents" not in columns
+    if migrated:
+        _migrate_legacy(conn, columns)
+    conn.execute(TRANSACTIONS_SQL)
+    conn.execute(VIEW_SQL)
+    conn.execute(ARCHIVE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_archive_date ON transactions_archive (date, id)")
+    conn.execute(ALL_VIEW_SQL)
+    # Keeps re-imported statements and recurring runs from duplicating rows
+    # that have already been archived
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS transactions_archived_hash
+        BEFORE INSERT ON transactions
+        WHEN NEW.import_hash IS NOT NULL
+             AND EXISTS (SELECT 1 FROM transactions_archive WHERE import_hash = NEW.import_hash)
+        BEGIN
+            SELECT RAISE(IGNORE);
+        END
+    ''')
+    return migrated
+
+
+def _migrate_legacy(conn, columns):
+    # Renaming carries the old indexes and triggers along, and dropping the
+    # renamed table removes them; the callers recreate them afterwards.
+    conn.execute("DROP VIEW IF EXISTS transactions_view")
+    conn.execute("DROP VIEW IF EXISTS transactions_all_view")
+    conn.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+    conn.execute(TRANSACTIONS_SQL)
+    conn.execute('''
+        INSERT OR IGNORE INTO categories (name)
+        SELECT DISTINCT category FROM transactions_legacy WHERE COALESCE(category, '') <> ''
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO cards (name)
+        SELECT DISTINCT card FROM transactions_legacy WHERE COALESCE(card, '') <> ''
+    ''')
+    import_hash = "l.import_hash" if "import_hash" in columns else "NULL"
+    conn.execute(f'''
+        INSERT INTO transactions (id, type, date, amount_cents, category_id, card_id, description, import_hash)
+        SELECT l.id, COALESCE(l.type, ''), COALESCE(date(l.date), l.date, ''),
+               CAST(ROUND(COALESCE(l.amount, 0) * 100) AS INTEGER),
+               c.id, k.id, l.description, {import_hash}
+        FROM transactions_legacy l
+        LEFT JOIN categories c ON c.name = l.category
+        LEFT JOIN cards k ON k.name = l.card
+    ''')
+    # Keep AUTOINCREMENT from reusing ids of rows deleted before the migration
+    conn.execute('''
+        UPDATE sqlite_sequence
+        SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transactions_legacy'), 0))
+        WHERE name = 'transactions'
+    ''')
+    conn.execute("DROP TABLE transactions_legacy")
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions_legacy'")
+
+
+# -----------------------------
+# Encoding Helpers
+# -----------------------------
+def to_cents(amount):
+    # Decimal avoids float artefacts such as 12.345 * 100 == 1234.4999...
+    return int((Decimal(str(amount or 0)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def month_key(date):
+    return str(date)[:7]
+
+
+def month_label(key):
+    # "2026-10" -> "October 2026"
+    try:
+        year, month = key.split("-")
+        return f"{calendar.month_name[int(month)]} {year}"
+    except (ValueError, IndexError):
+        return key
+
+
+def month_range(key):
+    # Inclusive ISO date bounds, so month filters stay index range scans
+    year, month = (int(part) for part in key.split("-"))
+    last = calendar.monthrange(year, month)[1]
+    return f"{key}-01", datetime.date(year, month, last).isoformat()
+
+
+def ensure_lookups(conn, categories=(), cards=()):
+    conn.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", [(c,) for c in set(categories) if c])
+    conn.executemany("INSERT OR IGNORE INTO cards (name) VALUES (?)", [(c,) for c in set(cards) if c])
+
+
+def insert_transactions(conn, rows):
+    # rows: (type, date, amount, category, description, card, import_hash)
+    # tuples with amounts in currency units; returns the number inserted.
+    rows = list(rows)
+    ensure_lookups(conn, (r[3] for r in rows), (r[5] for r in rows))
+    cursor = conn.executemany(INSERT_SQL, [
+        (trx_type, str(date), to_cents(amount), category, card, description, import_hash)
+        for trx_type, date, amount, category, description, card, import_hash in rows
+    ])
+    return cursor.rowcount
+
+
+def update_transactions(conn, rows):
+    # rows: (id, type, date, amount, category, description, card) tuples;
+    # returns the number of rows updated. Archived rows are edited in place.
+    rows = list(rows)
+    ensure_lookups(conn, (r[4] for r in rows), (r[6] for r in rows))
+    params = [
+        (trx_type, str(date), to_cents(amount), category, card, description, int(trx_id))
+        for trx_id, trx_type, date, amount, category, description, card in rows
+    ]
+    return sum(conn.executemany(UPDATE_SQL.format(table=table), params).rowcount for table in PARTITIONS)
+
+
+def delete_transactions(conn, ids):
+    params = [(int(i),) for i in ids]
+    return sum(conn.executemany(f"DELETE FROM {table} WHERE id = ?", params).rowcount for table in PARTITIONS)
@@ -0,0 +1,124 @@
+import re
+import sqlite3
+from .db import DB_FILE, connection, transaction
+from .schema import PARTITIONS
+
+SEARCH_LIMIT = 200
+SEARCH_COLUMNS = ["description", "category", "card"]
+
+
+# -----------------------------
+# Full-text Index
+# -----------------------------
+# External-content FTS5 table over transactions_all_view (both the hot and
+# archive partitions), kept in sync by triggers so the index never stores a
+# second copy of the text. Category and card names are resolved from the
+# lookup tables as rows change.
+CATEGORY_NAME = "(SELECT name FROM categories WHERE id = {row}.category_id)"
+CARD_NAME = "(SELECT name FROM cards WHERE id = {row}.card_id)"
+
+
+def _fts_values(row):
+    return f"{row}.id, {row}.description, {CATEGORY_NAME.format(row=row)}, {CARD_NAME.format(row=row)}"
+
+
+def create_search_index(conn):
+    existing = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'transactions_fts'"
+    ).fetchone()
+    if existing and "transactions_all_view" not in existing[0]:
+        # Older index over transactions or the hot-only view
+        conn.execute("DROP TABLE transactions_fts")
+        existing = None
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                description, category, card,
+                content='transactions_all_view', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5; search_transactions falls back to LIKE
+        return False
+    for table in PARTITIONS:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_insert_fts
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO transactions_fts (rowid, description, category, card)
+                VALUES ({_fts_values("NEW")});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_delete_fts
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, description, category, card)
+                VALUES ('delete', {_fts_values("OLD")});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_update_fts
+            AFTER UPDATE OF description, category_id, card_id ON {table}
+            BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, description, category, card)
+                VALUES ('delete', {_fts_values("OLD")});
+                INSERT INTO transactions_fts (rowid, description, category, card)
+                VALUES ({_fts_values("NEW")});
+            END
+        ''')
+    if not existing:
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    return True
+
+
+def has_search_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'"
+    ).fetchone() is not None
+
+
+# -----------------------------
+# Search
+# -----------------------------
+def build_match_query(search_term):
+    # Every word must match (implicit AND); each is a quoted prefix query so
+    # user input can never be parsed as FTS5 syntax.
+    terms = re.findall(r"\w+", search_term.lower())
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search_transactions(search_term, limit=SEARCH_LIMIT, db_file=DB_FILE):
+    import pandas as pd
+
+    match = build_match_query(search_term)
+    if not match:
+        return pd.DataFrame()
+    with connection(db_file) as conn:
+        if has_search_index(conn):
+            return pd.read_sql('''
+                SELECT t.* FROM transactions_fts
+                JOIN transactions_all_view t ON t.id = transactions_fts.rowid
+                WHERE transactions_fts MATCH ?
+                ORDER BY bm25(transactions_fts), t.date DESC
+                LIMIT ?
+            ''', conn, params=(match, limit))
+
+        terms = re.findall(r"\w+", search_term.lower())
+        clauses = " AND ".join(
+            "(" + " OR ".join(f"LOWER(COALESCE({col}, '')) LIKE ?" for col in SEARCH_COLUMNS) + ")"
+            for _ in terms
+        )
+        params = [f"%{t}%" for t in terms for _ in SEARCH_COLUMNS] + [limit]
+        return pd.read_sql(
+            f"SELECT * FROM transactions_all_view WHERE {clauses} ORDER BY date DESC LIMIT ?",
+            conn, params=params,
+        )
+
+
+def rebuild_search_index(db_file=DB_FILE):
+    with transaction(db_file) as conn:
+        if has_search_index(conn):
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
@@ -0,0 +1,142 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .db import DB_FILE, connection, data_version
+from .cache import query_cache
+
+# pandas is imported inside the builders only; they run on the worker pool.
+
+WINDOWS = [3, 6, 12]    # months in each rolling category window
+TREND_WORKERS = 3
+TRENDS = ["category_spend", "card_balances", "savings_rate"]
+
+
+# -----------------------------
+# Monthly Source Frame
+# -----------------------------
+# Every trend starts from the rollups (month x type x category x card sums),
+# so years of history are a few thousand rows, not the ledger. Months are
+# parsed to timestamps and resampled to a full monthly index, so months with
+# nothing recorded count as zero instead of being skipped by the windows.
+def _rollup_frame(db_file):
+    import pandas as pd
+
+    with connection(db_file) as conn:
+        frame = pd.read_sql('''
+            SELECT r.month, r.type, COALESCE(c.name, '') AS category, COALESCE(k.name, '') AS card,
+                   r.total_cents / 100.0 AS amount
+            FROM rollups r
+            LEFT JOIN categories c ON c.id = r.category_id
+            LEFT JOIN cards k ON k.id = r.card_id
+        ''', conn)
+    frame["month"] = pd.to_datetime(frame["month"], format="%Y-%m")
+    return frame
+
+
+def _monthly(frame, column):
+    # month x column sums over a gap-free month start index
+    import pandas as pd
+
+    if frame.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="month"))
+    return frame.pivot_table(index="month", columns=column, values="amount", aggfunc="sum").resample("MS").sum()
+
+
+# -----------------------------
+# Trend Builders
+# -----------------------------
+def category_spend(frame, windows=WINDOWS):
+    # Rolling spend per category: rows are (window, month), e.g. "3m", one
+    # column per category
+    import pandas as pd
+
+    monthly = _monthly(frame[frame["type"] == "Expense"], "category")
+    return pd.concat({f"{w}m": monthly.rolling(w, min_periods=1).sum() for w in windows}, names=["window"])
+
+
+def card_balances(frame):
+    # Outstanding balance per card at each month end and its change from the
+    # month before; columns are ("balance" | "change", card). Balances carry
+    # over months without card activity, through the ledger's latest month.
+    import pandas as pd
+
+    cards = frame[(frame["card"] != "") & frame["type"].isin(["Expense", "Repayment"])]
+    signed = cards.assign(amount=cards["amount"].where(cards["type"] == "Expense", -cards["amount"]))
+    monthly = _monthly(signed, "card")
+    if not frame.empty:
+        months = pd.date_range(frame["month"].min(), frame["month"].max(), freq="MS", name="month")
+        monthly = monthly.reindex(months, fill_value=0.0)
+    balance = monthly.cumsum()
+    return pd.concat({"balance": balance, "change": balance.diff().fillna(balance)}, axis=1)
+
+
+def savings_rate(frame):
+    # Share of each month's income not spent, alone and over the trailing
+    # three months; months without income have no rate
+    totals = _monthly(frame[frame["type"].isin(["Income", "Expense"])], "type")
+    totals = totals.reindex(columns=["Income", "Expense"], fill_value=0.0)
+    totals["saved"] = totals["Income"] - totals["Expense"]
+    totals["rate"] = totals["saved"] / totals["Income"].where(totals["Income"] > 0)
+    income_3m = totals["Income"].rolling(3, min_periods=1).sum()
+    totals["rate_3m"] = totals["saved"].rolling(3, min_periods=1).sum() / income_3m.where(income_3m > 0)
+    return totals
+
+
+_BUILDERS = {
+    "category_spend": category_spend,
+    "card_balances": card_balances,
+    "savings_rate": savings_rate,
+}
+
+
+# -----------------------------
+# Worker Pool
+# -----------------------------
+# Trends are built on a small thread pool so a rerun never computes them on
+# the script thread. Results are cached per transactions version: the first
+# rerun after a write rebuilds them once, and every other rerun gets them
+# straight from the cache. The source frame is loaded under a lock, so
+# workers that start together share one read instead of racing to fill the
+# cache.
+_pool = None
+_pool_lock = threading.Lock()
+_frame_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TREND_WORKERS, thread_name_prefix="trends")
+        return _pool
+
+
+def _build(name, version, db_file):
+    with _frame_lock:
+        frame = query_cache.get_or_load((db_file, "trend_source"), version, lambda: _rollup_frame(db_file))
+    return query_cache.get_or_load((db_file, "trend", name), version, lambda: _BUILDERS[name](frame))
+
+
+def submit_trends(names=TRENDS, db_file=DB_FILE):
+    # Returns {name: Future}; futures for an unchanged ledger resolve from
+    # the cache almost immediately
+    version = data_version("transactions", db_file)
+    pool = _executor()
+    return {name: pool.submit(_build, name, version, db_file) for name in names}
+
+
+def get_trend(name, db_file=DB_FILE):
+    return submit_trends([name], db_file)[name].result()
+
+
+def compute_trends(db_file=DB_FILE):
+    # Uncached and on the calling thread, for benchmarks and scripts
+    frame = _rollup_frame(db_file)
+    return {name: build(frame) for name, build in _BUILDERS.items()}
+
+
+def close_trends():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
@@ -0,0 +1,227 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from .db import DB_FILE, transaction
+
+BATCH_MAX = 64      # writes committed together at most
+RETRIES = 5
+BACKOFF = 0.05      # seconds, doubled on every retry
+
+_STOP = object()
+
+
+# -----------------------------
+# Write Queue
+# -----------------------------
+# Every session in the process hands its writes to one background thread per
+# database. The thread drains whatever is queued (up to BATCH_MAX), applies
+# each write inside its own savepoint of a single BEGIN IMMEDIATE transaction
+# and resolves each caller's Future once the batch has committed. A write that
+# raises only rolls back its own savepoint. When BEGIN cannot get the lock
+# (another process such as the CLI holding the database) the batch is retried
+# with exponential backoff. Once the funcs have run they are never called
+# again: a func need not be safe to re-run (an import consumes a one-shot
+# record stream, a reset takes a snapshot), so a failure after that point,
+# including a lock error on COMMIT, fails the whole batch.
+#
+# Exclusive writes (a reset, a restore) are never batched. The batch being
+# collected when one comes up is committed first, then the exclusive func
+# runs alone on the writer thread with its own connections: everything
+# queued before it has committed and nothing queued after it has started.
+class WriteQueue:
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._retries = 0
+        self._largest_batch = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"writer:{self.db_file}", daemon=True)
+                self._thread.start()
+
+    def _put(self, func, args, kwargs, exclusive):
+        future = Future()
+        with self._lock:
+            self._submitted += 1
+        self._queue.put((future, func, args, kwargs, exclusive))
+        self._ensure_started()
+        return future
+
+    def submit(self, func, *args, **kwargs):
+        # func is called as func(conn, *args, **kwargs) on the writer thread
+        return self._put(func, args, kwargs, False)
+
+    def submit_exclusive(self, func, *args, **kwargs):
+        # func is called as func(*args, **kwargs) on the writer thread, between batches
+        return self._put(func, args, kwargs, True)
+
+    def _wait(self, future):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("write() called from inside a queued write")
+        # No timeout: every Future is resolved, at worst after RETRIES busy
+        # waits, and giving up early would not stop the write from landing.
+        return future.result()
+
+    def write(self, func, *args, **kwargs):
+        return self._wait(self.submit(func, *args, **kwargs))
+
+    def write_exclusive(self, func, *args, **kwargs):
+        return self._wait(self.submit_exclusive(func, *args, **kwargs))
+
+    def _run(self):
+        job = None
+        while True:
+            if job is None:
+                job = self._queue.get()
+            if job is _STOP:
+                return
+            if job[4]:
+                self._run_exclusive(job)
+                job = None
+                continue
+            batch, job = [job], None
+            while len(batch) < BATCH_MAX:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    job = None
+                    break
+                if job is _STOP or job[4]:
+                    break   # handled once this batch has committed
+                batch.append(job)
+                job = None
+            self._commit(batch)
+
+    def _run_exclusive(self, job):
+        future, func, args, kwargs, _ = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            failed = 1
+        else:
+            future.set_result(result)
+            failed = 0
+        with self._lock:
+            self._batches += 1
+            self._completed += 1 - failed
+            self._failed += failed
+            self._largest_batch = max(self._largest_batch, 1)
+
+    def _commit(self, batch):
+        batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        for attempt in range(RETRIES + 1):
+            applied = False
+            try:
+                with transaction(self.db_file) as conn:
+                    applied = True
+                    outcomes = [_apply(conn, func, args, kwargs) for _, func, args, kwargs, _ in batch]
+                break
+            except sqlite3.OperationalError as exc:
+                if applied or not _is_lock_error(exc) or attempt == RETRIES:
+                    outcomes = [(False, exc)] * len(batch)
+                    break
+                with self._lock:
+                    self._retries += 1
+                time.sleep(BACKOFF * 2 ** attempt)
+            except BaseException as exc:
+                outcomes = [(False, exc)] * len(batch)
+                break
+
+        failed = 0
+        for (future, *_), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                failed += 1
+                future.set_exception(value)
+        with self._lock:
+            self._batches += 1
+            self._completed += len(batch) - failed
+            self._failed += failed
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_file": self.db_file,
+                "queued": self._queue.qsize(),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "batches": self._batches,
+                "retries": self._retries,
+                "largest_batch": self._largest_batch,
+            }
+
+    def close(self):
+        # Finishes everything already queued before the thread exits
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+
+def _apply(conn, func, args, kwargs):
+    conn.execute("SAVEPOINT queued_write")
+    try:
+        result = func(conn, *args, **kwargs)
+    except Exception as exc:
+        conn.execute("ROLLBACK TO queued_write")
+        conn.execute("RELEASE queued_write")
+        return False, exc
+    conn.execute("RELEASE queued_write")
+    return True, result
+
+
+def _is_lock_error(exc):
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_file=DB_FILE):
+    with _writers_lock:
+        writer = _writers.get(db_file)
+        if writer is None:
+            writer = _writers[db_file] = WriteQueue(db_file)
+        return writer
+
+
+def write(db_file, func, *args, **kwargs):
+    # Blocks until the write has committed; exceptions raised by func are
+    # re-raised here in the caller's thread.
+    return get_writer(db_file).write(func, *args, **kwargs)
+
+
+def write_exclusive(db_file, func, *args, **kwargs):
+    # Same, for a func that opens its own connections and must not share a
+    # transaction with other writes
+    return get_writer(db_file).write_exclusive(func, *args, **kwargs)
+
+
+def writer_stats(db_file=DB_FILE):
+    return get_writer(db_file).stats()
+
+
+def close_writers():
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
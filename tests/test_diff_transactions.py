@@ -0,0 +1,71 @@
+import datetime
+import pytest
+from expense_core.ledger import diff_transactions
+
+pd = pytest.importorskip("pandas")
+
+
+def _original():
+    # Shaped like get_transactions_between(..., columns=["id"] + EDITABLE_COLUMNS)
+    return pd.DataFrame({
+        "id": [1, 2],
+        "type": ["Expense", "Income"],
+        "date": pd.to_datetime(["2026-10-01", "2026-10-02"]),
+        "amount": [12.3, 100.0],
+        "category": ["Food", None],
+        "description": ["Lunch", ""],
+        "card": ["RBC", None],
+    })
+
+
+def _grid(frame):
+    # The editor works on plain dates
+    grid = frame.copy()
+    grid["date"] = grid["date"].dt.date
+    return grid
+
+
+def test_unchanged_grid_writes_nothing():
+    assert diff_transactions(_original(), _grid(_original())) == ([], [], [])
+
+
+def test_missing_values_match_empty_strings():
+    grid = _grid(_original())
+    grid["category"] = grid["category"].fillna("")
+    grid["card"] = grid["card"].fillna("")
+    assert diff_transactions(_original(), grid) == ([], [], [])
+
+
+def test_amounts_compare_in_cents():
+    grid = _grid(_original())
+    grid.loc[0, "amount"] = 12.300000001
+    assert diff_transactions(_original(), grid) == ([], [], [])
+
+    grid.loc[0, "amount"] = 12.31
+    inserts, updates, deletes = diff_transactions(_original(), grid)
+    assert updates == [(1, "Expense", "2026-10-01", 12.31, "Food", "Lunch", "RBC")]
+    assert inserts == [] and deletes == []
+
+
+def test_date_change_is_an_update():
+    grid = _grid(_original())
+    grid.loc[1, "date"] = datetime.date(2026, 10, 5)
+    _, updates, _ = diff_transactions(_original(), grid)
+    assert updates == [(2, "Income", "2026-10-05", 100.0, "", "", "")]
+
+
+def test_new_rows_are_inserts_and_missing_rows_deletes():
+    grid = _grid(_original()).iloc[[0]]
+    added = pd.DataFrame([{"id": None, "type": "Expense", "date": datetime.date(2026, 10, 3), "amount": 5,
+                           "category": "Food", "description": "Coffee", "card": None}])
+    inserts, updates, deletes = diff_transactions(_original(), pd.concat([grid, added], ignore_index=True))
+    assert inserts == [("Expense", "2026-10-03", 5, "Food", "Coffee", "", None)]
+    assert updates == []
+    assert deletes == [2]
+
+
+def test_incomplete_row_is_rejected():
+    grid = _grid(_original())
+    grid.loc[1, "amount"] = float("nan")
+    with pytest.raises(ValueError, match="Row 2"):
+        diff_transactions(_original(), grid)
@@ -0,0 +1,56 @@
+import datetime
+import pytest
+from expense_core.recurring import occurrences
+
+
+def dates(*values):
+    return [datetime.date.fromisoformat(v) for v in values]
+
+
+def test_month_end_clamps_without_drifting():
+    got = list(occurrences("monthly", "2026-01-31", "2026-01-01", "2026-05-31"))
+    assert got == dates("2026-01-31", "2026-02-28", "2026-03-31", "2026-04-30", "2026-05-31")
+
+
+def test_month_end_clamps_to_leap_day():
+    got = list(occurrences("monthly", "2028-01-31", "2028-02-01", "2028-03-31"))
+    assert got == dates("2028-02-29", "2028-03-31")
+
+
+def test_yearly_leap_day_anchor():
+    got = list(occurrences("yearly", "2028-02-29", "2028-03-01", "2032-12-31"))
+    assert got == dates("2029-02-28", "2030-02-28", "2031-02-28", "2032-02-29")
+
+
+def test_weekly_aligns_after_to_the_start_date():
+    got = list(occurrences("weekly", "2026-01-01", "2026-01-10", "2026-01-31"))
+    assert got == dates("2026-01-15", "2026-01-22", "2026-01-29")
+
+
+def test_biweekly_includes_an_occurrence_on_after():
+    got = list(occurrences("biweekly", "2026-01-01", "2026-01-15", "2026-02-12"))
+    assert got == dates("2026-01-15", "2026-01-29", "2026-02-12")
+
+
+def test_after_before_start_begins_at_start():
+    got = list(occurrences("quarterly", "2026-01-15", "2025-06-01", "2026-12-31"))
+    assert got == dates("2026-01-15", "2026-04-15", "2026-07-15", "2026-10-15")
+
+
+def test_quarterly_aligns_after_mid_cycle():
+    got = list(occurrences("quarterly", "2026-01-15", "2026-05-01", "2026-12-31"))
+    assert got == dates("2026-07-15", "2026-10-15")
+
+
+def test_end_date_caps_until():
+    got = list(occurrences("monthly", "2026-01-10", "2026-01-01", "2026-12-31", end_date="2026-03-10"))
+    assert got == dates("2026-01-10", "2026-02-10", "2026-03-10")
+
+
+def test_nothing_due_yields_nothing():
+    assert list(occurrences("monthly", "2026-01-10", "2026-02-11", "2026-03-09")) == []
+
+
+def test_unknown_frequency():
+    with pytest.raises(ValueError, match="fortnightly"):
+        list(occurrences("fortnightly", "2026-01-01", "2026-01-01", "2026-02-01"))
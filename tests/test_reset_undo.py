@@ -0,0 +1,92 @@
+import threading
+import pytest
+from expense_core.backup import restore_backup, take_snapshot, undo_reset
+from expense_core.db import connection
+from expense_core.ledger import _reset_transactions, add_transaction, create_tables, reset_transactions
+from expense_core.schema import insert_transactions
+from expense_core.writer import get_writer
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_file = str(tmp_path / "ledger.db")
+    create_tables(db_file)
+    return db_file
+
+
+def _add(description, db_file):
+    add_transaction({"type": "Expense", "date": "2026-10-01", "amount": 5, "category": "Food",
+                     "description": description, "card": ""}, db_file)
+
+
+def _row(description):
+    return [("Expense", "2026-10-01", 5, "Food", description, "", None)]
+
+
+def _descriptions(db_file):
+    with connection(db_file) as conn:
+        return sorted(r[0] for r in conn.execute("SELECT description FROM transactions_view"))
+
+
+def _hold_writer(db_file):
+    # Parks the writer thread until the returned event is set, so the next
+    # submissions queue up behind it
+    started, release = threading.Event(), threading.Event()
+
+    def blocker(conn):
+        started.set()
+        release.wait()
+    get_writer(db_file).submit(blocker)
+    started.wait()
+    return release
+
+
+def test_undo_restores_the_ledger(db):
+    _add("before", db)
+    undo = reset_transactions(db)
+    assert _descriptions(db) == []
+    assert undo_reset(**undo, db_file=db)
+    assert _descriptions(db) == ["before"]
+
+
+def test_undo_refused_after_a_later_write(db):
+    _add("before", db)
+    undo = reset_transactions(db)
+    _add("after", db)
+    assert not undo_reset(**undo, db_file=db)
+    assert _descriptions(db) == ["after"]
+
+
+def test_reset_snapshot_includes_writes_queued_before_it(db):
+    release = _hold_writer(db)
+    queued = get_writer(db).submit(insert_transactions, _row("queued"))
+    reset = get_writer(db).submit_exclusive(_reset_transactions, db)
+    release.set()
+    assert queued.result() == 1
+    assert undo_reset(**reset.result(), db_file=db)
+    assert _descriptions(db) == ["queued"]
+
+
+def test_write_queued_before_undo_is_never_overwritten(db):
+    _add("before", db)
+    undo = reset_transactions(db)
+    release = _hold_writer(db)
+    queued = get_writer(db).submit(insert_transactions, _row("after"))
+    result = {}
+    undoing = threading.Thread(target=lambda: result.setdefault("undone", undo_reset(**undo, db_file=db)))
+    undoing.start()
+    while get_writer(db).stats()["queued"] < 2:
+        threading.Event().wait(0.001)
+    release.set()
+    undoing.join()
+    assert queued.result() == 1
+    assert result["undone"] is False
+    assert _descriptions(db) == ["after"]
+
+
+def test_restore_backup_goes_through_the_queue(db):
+    _add("kept", db)
+    path = take_snapshot(db)
+    _add("dropped", db)
+    restore_backup(path, db)
+    assert _descriptions(db) == ["kept"]